@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Benchmark: per-request ClientSession vs pooled APIClient session.
+
+Starts the local stand-in backend and measures p50/p99 latency of
+GET /api/lw-coin/balance for both strategies.
+
+Usage:
+    python -m benchmarks.api_client_bench --requests 500 --concurrency 20 --latency fixed:2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault('BOT_TOKEN', 'benchmark:token')
+
+import aiohttp
+
+from benchmarks.stub_backend import StubSettings, start_stub_backend
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(call, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    return latencies, elapsed
+
+
+def report(name, latencies, elapsed):
+    print(f"{name:<22} p50={percentile(latencies, 50):7.2f}ms "
+          f"p99={percentile(latencies, 99):7.2f}ms "
+          f"mean={statistics.mean(latencies):7.2f}ms "
+          f"rps={len(latencies) / elapsed:8.1f}")
+
+
+async def main(total: int, concurrency: int, latency: str):
+    runner, base_url, _ = await start_stub_backend(StubSettings(latency=latency))
+
+    from bot.api_client import APIClient
+    client = APIClient()
+    client.base_url = base_url
+    headers = {'Authorization': 'Bearer benchmark'}
+
+    async def per_request_session():
+        async with aiohttp.ClientSession(timeout=client.timeout) as session:
+            async with session.get(f"{base_url}/api/lw-coin/balance", headers=headers) as response:
+                await response.json()
+
+    tokens = iter(range(10 ** 9))
+
+    async def pooled_session():
+        # Unique token per call so single-flight coalescing does not skew results
+        await client.get_balance(f"benchmark-{next(tokens)}")
+
+    try:
+        await client.start()
+        # Warm up both paths
+        await run(per_request_session, concurrency, concurrency)
+        await run(pooled_session, concurrency, concurrency)
+
+        report('per-request session', *await run(per_request_session, total, concurrency))
+        report('pooled session', *await run(pooled_session, total, concurrency))
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--latency', default='fixed:0', help="stand-in latency, e.g. lognormal:20:0.5")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.latency))
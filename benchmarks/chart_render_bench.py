@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Chart render cost vs. series length.
+
+Renders the spending and revenue charts in-process for 30, 90 and 365
+daily points and a year of hourly points, once with downsampling
+(--max-points) and once with every point drawn, and reports the best
+render time and PNG size of each.
+
+Usage:
+    python -m benchmarks.chart_render_bench
+    python -m benchmarks.chart_render_bench --max-points 300 --runs 3
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+workdir = tempfile.mkdtemp(prefix='bot-charts-')
+os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+os.environ.setdefault('DATABASE_URL', f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}")
+os.environ.setdefault('LOG_FILE', os.path.join(workdir, 'bench.log'))
+
+from bot.utils.charts import _render_spending_chart, _render_revenue_chart  # noqa: E402
+
+SERIES = [('30d', 30, timedelta(days=1)), ('90d', 90, timedelta(days=1)),
+          ('365d', 365, timedelta(days=1)), ('365d hourly', 365 * 24, timedelta(hours=1))]
+
+
+def make_series(points: int, step: timedelta, seed: int = 7):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    spending, revenue = [], []
+    for i in range(points):
+        moment = start + step * i
+        key = moment.strftime('%Y-%m-%d') if step >= timedelta(days=1) else moment.isoformat()
+        spending.append({'date': key, 'totalSpent': max(0, int(rng.gauss(120, 40)))})
+        revenue.append({'date': key, 'totalRevenue': round(rng.choice([0, 0, 4.99, 9.99, 19.99]), 2)})
+    return spending, revenue
+
+
+def best_of(runs: int, render, *args):
+    best, size = None, 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        png = render(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+        size = len(png)
+    return best * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-points', type=int, default=300)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'series':<13} {'chart':<9} {'mode':<12} {'render':>10} {'png':>10}")
+    for label, points, step in SERIES:
+        spending, revenue = make_series(points, step)
+        for mode, max_points in (('downsampled', args.max_points), ('full', 10 ** 9)):
+            for chart, render, data in (('spending', _render_spending_chart, (spending,)),
+                                        ('revenue', _render_revenue_chart, (revenue, None))):
+                ms, size = best_of(args.runs, render, *data, max_points)
+                print(f"{label:<13} {chart:<9} {mode:<12} {ms:8.1f}ms {size / 1024:8.1f}KB")
+
+
+if __name__ == '__main__':
+    main()
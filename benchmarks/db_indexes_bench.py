@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Benchmark: hot-path query plans and timings with and without the
+secondary indexes from migrations/versions/0001_hot_path_indexes.py.
+
+Fills a temporary SQLite database with --rows users and payments
+(and rows/100 referral links), runs the bot's hot queries, then creates
+the indexes and runs them again.
+
+Usage:
+    python -m benchmarks.db_indexes_bench --rows 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('BOT_TOKEN', 'benchmark:token')
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.dialects import sqlite as sqlite_dialect
+
+from bot.database import Base, Payment, ReferralLink, User
+
+PACKAGES = ['week_50', 'month_200', 'month_500']
+STATUSES = ['pending', 'completed', 'completed', 'completed', 'expired']
+
+
+def fill(path: str, rows: int, seed: int):
+    random.seed(seed)
+    now = datetime.utcnow()
+    fmt = '%Y-%m-%d %H:%M:%S.%f'
+
+    def moment(days_back: float):
+        return (now - timedelta(days=days_back)).strftime(fmt)
+
+    connection = sqlite3.connect(path)
+    connection.executemany(
+        "INSERT INTO bot_users (telegram_id, created_at, last_active) VALUES (?, ?, ?)",
+        ((100000 + i, moment(random.uniform(0, 365)), moment(random.uniform(0, 90)))
+         for i in range(rows))
+    )
+    connection.executemany(
+        "INSERT INTO payments (telegram_id, package_id, status, amount, created_at, completed_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (100000 + random.randrange(rows // 4 or 1), random.choice(PACKAGES), status,
+             random.choice([2.0, 5.0, 10.0, 20.0]), moment(days), moment(days) if status == 'completed' else None)
+            for status, days in ((random.choice(STATUSES), random.uniform(0, 365)) for _ in range(rows))
+        )
+    )
+    connection.executemany(
+        "INSERT INTO referral_links (code, name, is_active, created_at, clicks) VALUES (?, ?, ?, ?, 0)",
+        ((f"code{i}", f"Link {i}", random.random() < 0.3, moment(random.uniform(0, 365)))
+         for i in range(max(rows // 100, 10)))
+    )
+    connection.commit()
+    connection.close()
+
+
+def hot_queries():
+    now = datetime.utcnow()
+    today_start = datetime.combine(now.date(), datetime.min.time())
+    return {
+        'tribute_pending_lookup': select(Payment).where(
+            Payment.telegram_id == 100042,
+            Payment.package_id == 'month_200',
+            Payment.status == 'pending'
+        ).order_by(Payment.created_at.desc()).limit(1),
+        'active_users_7d': select(func.count(User.id)).where(User.last_active >= now - timedelta(days=7)),
+        'total_revenue': select(func.sum(Payment.amount)).where(Payment.status == 'completed'),
+        'today_revenue': select(func.sum(Payment.amount))
+        .where(Payment.status == 'completed')
+        .where(Payment.completed_at >= today_start)
+        .where(Payment.completed_at < today_start + timedelta(days=1)),
+        'active_referral_links': select(ReferralLink)
+        .where(ReferralLink.is_active == True)
+        .order_by(ReferralLink.created_at.desc())
+        .limit(10),
+    }
+
+
+def measure(engine, label: str, repeat: int):
+    dialect = sqlite_dialect.dialect(paramstyle='named')
+    print(f"\n=== {label} ===")
+    with engine.connect() as connection:
+        for name, stmt in hot_queries().items():
+            compiled = stmt.compile(dialect=dialect)
+            plan = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}"), compiled.params).fetchall()
+
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                connection.execute(stmt).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+
+            print(f"{name:<24} best={min(timings):9.2f}ms  median={sorted(timings)[len(timings) // 2]:9.2f}ms")
+            for row in plan:
+                print(f"    {row[-1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='bot-idx-'), 'bench.db')
+    engine = create_engine(f"sqlite:///{path}")
+
+    # Legacy schema: tables only, no secondary indexes
+    indexes = [index for table in Base.metadata.sorted_tables for index in table.indexes]
+    for table in Base.metadata.sorted_tables:
+        table.create(engine)
+    with engine.begin() as connection:
+        for index in indexes:
+            connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+    started = time.perf_counter()
+    fill(path, args.rows, args.seed)
+    print(f"Filled {args.rows} rows in {time.perf_counter() - started:.1f}s ({path})")
+
+    measure(engine, 'without secondary indexes', args.repeat)
+
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        for index in indexes:
+            index.create(connection)
+        connection.execute(text("ANALYZE"))
+    print(f"\nCreated {len(indexes)} indexes in {time.perf_counter() - started:.1f}s")
+
+    measure(engine, 'with secondary indexes', args.repeat)
+
+
+if __name__ == '__main__':
+    main()
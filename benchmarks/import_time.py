@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Cold-start import-time report for the bot.
+
+Runs `python -X importtime -c "import <modules>"` in a fresh interpreter
+(--runs times, best run kept), prints the slowest imports by cumulative
+time, and checks that heavy plotting modules stay out of the bot process.
+The default modules cover startup (bot.main) and everything the chart
+handlers import when a chart is requested (bot.utils.charts_api).
+
+Exits with status 1 when --budget-ms is exceeded or a --forbid module is
+imported, so it can guard against cold-start regressions.
+
+Usage:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module bot.main --budget-ms 1500 --json import_time.json
+    python -m benchmarks.import_time --module bot.main --module bot.utils.charts_api
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+DEFAULT_FORBIDDEN = ['matplotlib', 'seaborn', 'pandas', 'scipy']
+DEFAULT_MODULES = ['bot.main', 'bot.utils.charts_api']
+
+
+def measure(modules: str, env: dict):
+    """[(name, self_us, cumulative_us, depth)] for one cold import"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {modules}"],
+        env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {modules} failed:\n{completed.stderr[-2000:]}")
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', action='append', help="module to import, repeatable "
+                                                          f"(default: {', '.join(DEFAULT_MODULES)})")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('--budget-ms', type=float, help="fail if the total import time exceeds this")
+    parser.add_argument('--forbid', action='append', help="top-level package that must not be imported "
+                                                          f"(default: {', '.join(DEFAULT_FORBIDDEN)})")
+    parser.add_argument('--json', help="also write the report to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bot-import-')
+    env = dict(os.environ)
+    env.setdefault('BOT_TOKEN', '123456:benchmark')
+    env.setdefault('DATABASE_URL', f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}")
+    env.setdefault('LOG_FILE', os.path.join(workdir, 'bench.log'))
+
+    modules = ', '.join(args.module or DEFAULT_MODULES)
+    runs = [measure(modules, env) for _ in range(args.runs)]
+    best = min(runs, key=lambda rows: sum(row[1] for row in rows))
+    total_ms = sum(row[1] for row in best) / 1000
+    by_package = {}
+    for name, self_us, _, _ in best:
+        package = name.split('.')[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+
+    forbidden = args.forbid or DEFAULT_FORBIDDEN
+    leaked = sorted({name.split('.')[0] for name, _, _, _ in best} & set(forbidden))
+
+    print(f"import {modules}: {total_ms:.1f}ms total, {len(best)} modules (best of {args.runs})\n")
+    print(f"{'cumulative':>12} {'self':>9}  module")
+    for name, self_us, cumulative_us, depth in sorted(best, key=lambda row: -row[2])[:args.top]:
+        print(f"{cumulative_us / 1000:10.1f}ms {self_us / 1000:7.1f}ms  {'  ' * depth}{name}")
+
+    print("\nBy top-level package:")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:10]:
+        print(f"{self_us / 1000:10.1f}ms  {package}")
+
+    failures = []
+    if leaked:
+        failures.append(f"heavy modules imported at startup: {', '.join(leaked)}")
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        failures.append(f"import time {total_ms:.1f}ms exceeds budget {args.budget_ms:.1f}ms")
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump({
+                'module': modules,
+                'total_ms': round(total_ms, 1),
+                'modules': len(best),
+                'packages_ms': {package: round(us / 1000, 1) for package, us in by_package.items()},
+                'slowest': [{'module': name, 'cumulative_ms': round(cumulative / 1000, 1)}
+                            for name, _, cumulative, _ in sorted(best, key=lambda row: -row[2])[:args.top]],
+                'forbidden_imported': leaked,
+            }, output, indent=2)
+
+    for failure in failures:
+        print(f"\nFAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Benchmark: 30-day spending aggregation over the LwCoinTransaction ledger.
+
+Fills a temporary SQLite database with --rows 'spent' rows spread over
+--days days and compares:
+  sql group by    - per-day, per-feature GROUP BY on every request
+  numpy (cold)    - LedgerAnalytics first load + aggregation
+  numpy (warm)    - LedgerAnalytics aggregation after --append new rows
+
+Usage:
+    python -m benchmarks.ledger_analytics_bench --rows 2000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+FEATURES = ['photo', 'voice', 'text', 'recipe', 'workout']
+
+
+def fill(path: str, rows: int, days: int, seed: int):
+    random.seed(seed)
+    today = datetime.utcnow()
+    connection = sqlite3.connect(path)
+    connection.executemany(
+        "INSERT INTO lw_coin_transactions (telegram_id, amount, type, feature_used, created_at, date) "
+        "VALUES (?, ?, 'spent', ?, ?, ?)",
+        (
+            (100000 + random.randrange(10000), -random.randint(1, 10), random.choice(FEATURES),
+             moment.strftime('%Y-%m-%d %H:%M:%S.%f'), moment.strftime('%Y-%m-%d'))
+            for moment in (today - timedelta(minutes=random.uniform(0, days * 1440)) for _ in range(rows))
+        )
+    )
+    connection.commit()
+    connection.close()
+
+
+async def run_benchmark(args, path):
+    from sqlalchemy import func, select
+    from bot.database import db_manager, LwCoinTransaction
+    from bot.utils.analytics import ledger_analytics
+    from bot.utils.ledger import ledger_writer
+
+    await db_manager.init_db()
+    started = time.perf_counter()
+    fill(path, args.rows, args.days, args.seed)
+    print(f"Filled {args.rows} ledger rows in {time.perf_counter() - started:.1f}s ({path})")
+
+    since = (datetime.utcnow() - timedelta(days=29)).strftime('%Y-%m-%d')
+    started = time.perf_counter()
+    async with db_manager.SessionLocal() as session:
+        await session.execute(
+            select(LwCoinTransaction.date, LwCoinTransaction.feature_used,
+                   func.sum(-LwCoinTransaction.amount), func.count())
+            .where(LwCoinTransaction.type == 'spent')
+            .where(LwCoinTransaction.date >= since)
+            .group_by(LwCoinTransaction.date, LwCoinTransaction.feature_used)
+        )
+    print(f"{'sql group by':<16} {(time.perf_counter() - started) * 1000:9.1f}ms")
+
+    started = time.perf_counter()
+    await ledger_analytics.daily_spending(30)
+    print(f"{'numpy (cold)':<16} {(time.perf_counter() - started) * 1000:9.1f}ms  ({len(ledger_analytics)} rows loaded)")
+
+    for i in range(args.append):
+        await ledger_writer.write({'telegram_id': 100000 + i, 'amount': -1, 'type': 'spent',
+                                   'feature_used': random.choice(FEATURES), 'description': 'benchmark'})
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        await ledger_analytics.daily_spending(30)
+        await ledger_analytics.feature_usage(30)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"{'numpy (warm)':<16} {min(timings):9.1f}ms  (daily + feature charts, best of {args.repeat})")
+
+    await db_manager.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--append', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bot-analytics-')
+    path = os.path.join(workdir, 'bench.db')
+    os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+    os.environ['DATABASE_URL'] = f"sqlite+aiosqlite:///{path}"
+    os.environ['LOG_FILE'] = os.path.join(workdir, 'bench.log')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    asyncio.run(run_benchmark(args, path))
+
+
+if __name__ == '__main__':
+    main()
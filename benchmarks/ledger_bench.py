@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Benchmark: LwCoinTransaction rows/sec, one commit per row (the previous
+track_coin_spending path) versus the group-commit LedgerWriter.
+
+Both paths run --rows writes from --concurrency concurrent producers
+against a fresh SQLite file with the bot's connection profile, and both
+add the row's amount to User.total_spent.
+
+Usage:
+    python -m benchmarks.ledger_bench --rows 5000 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+USER_BASE = 100000000
+
+
+async def per_row_commit(row, spent):
+    from sqlalchemy import func, update
+    from bot.database import db_manager, LwCoinTransaction, User
+
+    async with db_manager.SessionLocal() as session:
+        session.add(LwCoinTransaction(**row))
+        await session.execute(
+            update(User)
+            .where(User.telegram_id == row['telegram_id'])
+            .values(total_spent=func.coalesce(User.total_spent, 0) + spent)
+        )
+        await session.commit()
+
+
+async def run_path(name, write, rows, concurrency, users):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def produce(i):
+        amount = random.randint(1, 10)
+        row = {
+            'telegram_id': USER_BASE + i % users,
+            'api_user_id': f"user-{i % users}",
+            'amount': -amount,
+            'type': 'spent',
+            'feature_used': random.choice(['photo', 'voice', 'text']),
+            'description': 'benchmark',
+        }
+        async with semaphore:
+            started = time.perf_counter()
+            await write(row, amount)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(produce(i) for i in range(rows)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{name:<18} {rows / elapsed:10.1f} rows/s  "
+          f"p50={latencies[len(latencies) // 2]:7.2f}ms  p99={latencies[int(len(latencies) * 0.99)]:7.2f}ms")
+
+
+async def run_benchmark(args):
+    from bot.database import db_manager
+    from bot.utils.ledger import ledger_writer
+
+    await db_manager.init_db()
+    for i in range(args.users):
+        await db_manager.create_user(telegram_id=USER_BASE + i, username=f"u{i}")
+
+    random.seed(args.seed)
+    await run_path('per-row commit', per_row_commit, args.rows, args.concurrency, args.users)
+
+    ledger_writer.start()
+    await run_path('ledger writer', lambda row, spent: ledger_writer.write(row, spent=spent),
+                   args.rows, args.concurrency, args.users)
+    await ledger_writer.stop()
+    print(f"ledger writer used {ledger_writer.batches_written} transactions for {ledger_writer.rows_written} rows")
+
+    await db_manager.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bot-ledger-')
+    os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+    os.environ['DATABASE_URL'] = f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['LOG_FILE'] = os.path.join(workdir, 'bench.log')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    asyncio.run(run_benchmark(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+Concurrency check for referral counters.
+
+Feeds --updates simultaneous "/start <code>" updates from distinct new
+users through the real Application (same setup as update_load), plus
+--purchases concurrent track_purchase calls, then verifies that the
+link's clicks, registrations, purchases and revenue and the creator's
+referral_count are exact. Exits with status 1 on any mismatch.
+
+Usage:
+    python -m benchmarks.referral_concurrency --updates 5000 --concurrency 500
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+import warnings
+
+from benchmarks.stub_backend import StubSettings, start_stub_backend
+from benchmarks.update_load import UpdateFactory, make_fake_bot, prepare_environment
+
+REFERRAL_CODE = 'spike'
+CREATOR_ID = 700000001
+PURCHASE_AMOUNT = 2.5
+
+
+async def run_check(args):
+    workdir = tempfile.mkdtemp(prefix='bot-referral-')
+    runner, base_url, backend = await start_stub_backend(StubSettings(latency=args.latency))
+    prepare_environment(base_url, workdir)
+
+    warnings.filterwarnings('ignore')
+    from sqlalchemy import func, select
+    from telegram import Update
+    from bot.config import config
+    from bot.database import db_manager, ReferralLink, User
+    from bot.main import build_application
+    from bot.utils.tracking import referral_counters, track_purchase
+
+    bot = make_fake_bot(config.BOT_TOKEN)
+    application = build_application(bot=bot)
+    await application.initialize()
+    await application.post_init(application)
+
+    await db_manager.create_user(telegram_id=CREATOR_ID, username='creator', referral_count=0)
+    async with db_manager.SessionLocal() as session:
+        session.add(ReferralLink(code=REFERRAL_CODE, name='Spike campaign',
+                                 creator_telegram_id=CREATOR_ID))
+        await session.commit()
+
+    factory = UpdateFactory(linked_users=1)
+    updates = [Update.de_json(factory.build('start_referral', REFERRAL_CODE), bot)
+               for _ in range(args.updates)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def feed(update):
+        async with semaphore:
+            await application.process_update(update)
+
+    async def purchase():
+        async with semaphore:
+            await track_purchase(REFERRAL_CODE, PURCHASE_AMOUNT)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(feed(update) for update in updates),
+                         *(purchase() for _ in range(args.purchases)))
+    elapsed = time.perf_counter() - started
+
+    # Buffered clicks/registrations must add up exactly once written
+    await referral_counters.flush()
+
+    async with db_manager.SessionLocal() as session:
+        link = (await session.execute(
+            select(ReferralLink).where(ReferralLink.code == REFERRAL_CODE)
+        )).scalar_one()
+        creator = (await session.execute(
+            select(User).where(User.telegram_id == CREATOR_ID)
+        )).scalar_one()
+        referred = (await session.execute(
+            select(func.count(User.id)).where(User.referred_by == REFERRAL_CODE)
+        )).scalar()
+
+    await application.post_shutdown(application)
+    await application.shutdown()
+    await runner.cleanup()
+
+    expected = {
+        'clicks': (link.clicks, args.updates),
+        'registrations': (link.registrations, args.updates),
+        'referred_users': (referred, args.updates),
+        'creator_referral_count': (creator.referral_count, args.updates),
+        'purchases': (link.purchases, args.purchases),
+        'total_revenue': (link.total_revenue, args.purchases * PURCHASE_AMOUNT),
+    }
+
+    print(f"{args.updates} updates + {args.purchases} purchases in {elapsed:.2f}s")
+    failed = False
+    for name, (actual, wanted) in expected.items():
+        ok = actual == wanted
+        failed |= not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {name:<24} {actual} (expected {wanted})")
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=2000)
+    parser.add_argument('--purchases', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--latency', default='fixed:5', help="stand-in backend latency")
+    args = parser.parse_args()
+
+    sys.exit(0 if asyncio.run(run_check(args)) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+"""
+Local stand-in for the FitnessTracker API.
+
+Implements every endpoint APIClient talks to with configurable latency
+distributions, error rates and payload sizes, so performance changes can
+be measured without touching production.
+
+Run standalone and point the bot at it:
+    python -m benchmarks.stub_backend --port 8081 --latency lognormal:20:0.5
+    API_BASE_URL=http://127.0.0.1:8081 python -m bot.main
+
+Or embed it in a benchmark:
+    runner, base_url, backend = await start_stub_backend(StubSettings(latency='fixed:5'))
+"""
+import argparse
+import asyncio
+import math
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from aiohttp import web
+
+
+class LatencyDistribution:
+    """Latency sampler parsed from 'kind:mean_ms[:spread]'
+
+    fixed:20           always 20ms
+    uniform:20:10      20ms +/- 10ms
+    normal:20:5        mean 20ms, stddev 5ms
+    lognormal:20:0.5   median 20ms, sigma 0.5 (long tail)
+    exponential:20     mean 20ms
+    """
+
+    def __init__(self, spec: str = 'fixed:0'):
+        parts = spec.split(':')
+        self.kind = parts[0]
+        self.mean_ms = float(parts[1]) if len(parts) > 1 else 0.0
+        self.spread = float(parts[2]) if len(parts) > 2 else 0.0
+
+        if self.kind not in ('fixed', 'uniform', 'normal', 'lognormal', 'exponential'):
+            raise ValueError(f"Unknown latency distribution: {self.kind}")
+
+    def sample(self) -> float:
+        """Delay in seconds"""
+        if self.kind == 'fixed':
+            ms = self.mean_ms
+        elif self.kind == 'uniform':
+            ms = random.uniform(self.mean_ms - self.spread, self.mean_ms + self.spread)
+        elif self.kind == 'normal':
+            ms = random.gauss(self.mean_ms, self.spread)
+        elif self.kind == 'lognormal':
+            ms = random.lognormvariate(math.log(max(self.mean_ms, 1e-3)), self.spread)
+        else:
+            ms = random.expovariate(1 / self.mean_ms) if self.mean_ms > 0 else 0.0
+        return max(ms, 0.0) / 1000
+
+
+class StubSettings:
+    """Behaviour of the stand-in backend
+
+    latency      - default LatencyDistribution spec for every route
+    error_rate   - probability of answering 503 instead of the real payload
+    days         - number of points in daily stats series
+    transactions - number of rows returned by /api/lw-coin/transactions
+    routes       - per-path-prefix overrides: {'/api/stats/': {'latency': 'lognormal:200:0.6'}}
+    """
+
+    def __init__(self, latency: str = 'fixed:0', error_rate: float = 0.0,
+                 days: int = 30, transactions: int = 50,
+                 routes: Optional[Dict[str, Dict]] = None, seed: Optional[int] = None):
+        self.latency = LatencyDistribution(latency)
+        self.error_rate = error_rate
+        self.days = days
+        self.transactions = transactions
+        self.routes = {
+            prefix: {
+                'latency': LatencyDistribution(override['latency']) if 'latency' in override else None,
+                'error_rate': override.get('error_rate')
+            }
+            for prefix, override in (routes or {}).items()
+        }
+        if seed is not None:
+            random.seed(seed)
+
+    def for_path(self, path: str):
+        """(latency, error_rate) for the longest matching route override"""
+        latency, error_rate = self.latency, self.error_rate
+        matches = [prefix for prefix in self.routes if path.startswith(prefix)]
+        if matches:
+            override = self.routes[max(matches, key=len)]
+            latency = override['latency'] or latency
+            if override['error_rate'] is not None:
+                error_rate = override['error_rate']
+        return latency, error_rate
+
+
+class StubBackend:
+    """In-memory state and route handlers"""
+
+    def __init__(self, settings: StubSettings):
+        self.settings = settings
+        self.balances: Dict[str, int] = {}
+        self.requests = 0
+        self.errors = 0
+
+    @web.middleware
+    async def behaviour(self, request, handler):
+        self.requests += 1
+        latency, error_rate = self.settings.for_path(request.path)
+        await asyncio.sleep(latency.sample())
+        if error_rate and random.random() < error_rate:
+            self.errors += 1
+            return web.json_response({'error': 'Injected failure'}, status=503)
+        return await handler(request)
+
+    @staticmethod
+    def _token(request) -> str:
+        return request.headers.get('Authorization', '').replace('Bearer ', '')
+
+    def _series(self, build):
+        today = datetime.utcnow().date()
+        return [build(today - timedelta(days=offset)) for offset in range(self.settings.days - 1, -1, -1)]
+
+    # Auth
+    async def send_code(self, request):
+        return web.json_response({'success': True})
+
+    async def confirm_email(self, request):
+        body = await request.json()
+        email = body.get('email', '')
+        return web.json_response({
+            'accessToken': f"stub-{email}",
+            'user': {'id': f"user-{abs(hash(email)) % 10 ** 8}", 'email': email}
+        })
+
+    # User
+    async def get_profile(self, request):
+        return web.json_response({'id': self._token(request), 'name': 'Stub User'})
+
+    async def update_profile(self, request):
+        return web.json_response({'success': True, **(await request.json())})
+
+    async def link_telegram(self, request):
+        return web.json_response({'success': True})
+
+    # Coins
+    async def balance(self, request):
+        token = self._token(request)
+        return web.json_response({
+            'balance': self.balances.get(token, 50),
+            'hasActiveSubscription': True,
+            'subscriptionExpiresAt': (datetime.utcnow() + timedelta(days=30)).isoformat()
+        })
+
+    async def set_balance(self, request):
+        body = await request.json()
+        self.balances[self._token(request)] = body.get('amount', 0)
+        return web.json_response({'success': True})
+
+    async def purchase(self, request):
+        body = await request.json()
+        token = self._token(request)
+        self.balances[token] = self.balances.get(token, 50) + body.get('coinsAmount', 0)
+        return web.json_response({'success': True, 'balance': self.balances[token]})
+
+    async def transactions(self, request):
+        now = datetime.utcnow()
+        return web.json_response([
+            {
+                'id': i,
+                'amount': -random.randint(1, 10),
+                'type': 'spent',
+                'feature': random.choice(['photo', 'voice', 'text']),
+                'createdAt': (now - timedelta(minutes=i * 37)).isoformat()
+            }
+            for i in range(self.settings.transactions)
+        ])
+
+    # Stats
+    async def user_stats(self, request):
+        return web.json_response({'totalActivities': random.randint(0, 500),
+                                  'totalMeals': random.randint(0, 2000)})
+
+    async def coin_spending_daily(self, request):
+        return web.json_response({'success': True, 'data': self._series(lambda day: {
+            'Date': day.strftime('%Y-%m-%d'),
+            'TotalSpent': random.randint(0, 400)
+        })})
+
+    async def revenue_daily(self, request):
+        return web.json_response({'success': True, 'data': self._series(lambda day: {
+            'Date': day.strftime('%Y-%m-%d'),
+            'TotalRevenue': round(random.uniform(0, 120), 2)
+        })})
+
+    async def revenue_by_source(self, request):
+        tribute = round(random.uniform(0, 2000), 2)
+        mobile = round(random.uniform(0, 2000), 2)
+        return web.json_response({'success': True, 'data': {
+            'tribute': {'count': random.randint(0, 300), 'revenue': tribute},
+            'mobile': {'count': random.randint(0, 300), 'revenue': mobile},
+            'total': {'revenue': tribute + mobile}
+        }})
+
+    async def db_info(self, request):
+        return web.json_response({'users': 12000, 'activities': 340000,
+                                  'foodIntakes': 910000, 'stepsRecords': 1200000})
+
+    # Payments
+    async def payment_check(self, request):
+        return web.json_response({'success': True, 'status': 'pending',
+                                  'orderId': request.match_info['order_id']})
+
+    async def payment_check_by_telegram(self, request):
+        return web.json_response({
+            'success': True,
+            'hasPayments': True,
+            'lastPayment': {'status': 'completed', 'amount': 5, 'coinsAmount': 300,
+                            'telegramId': int(request.match_info['telegram_id'])}
+        })
+
+    async def tribute_pending(self, request):
+        return web.json_response({'success': True, **(await request.json())})
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.behaviour])
+        app.router.add_post('/api/auth/send-code', self.send_code)
+        app.router.add_post('/api/auth/confirm-email', self.confirm_email)
+        app.router.add_get('/api/user/profile', self.get_profile)
+        app.router.add_put('/api/user/profile', self.update_profile)
+        app.router.add_post('/api/user/link-telegram', self.link_telegram)
+        app.router.add_get('/api/lw-coin/balance', self.balance)
+        app.router.add_post('/api/lw-coin/set-balance', self.set_balance)
+        app.router.add_post('/api/lw-coin/purchase-subscription', self.purchase)
+        app.router.add_get('/api/lw-coin/transactions', self.transactions)
+        app.router.add_get('/api/stats/user', self.user_stats)
+        app.router.add_get('/api/stats/coin-spending-daily', self.coin_spending_daily)
+        app.router.add_get('/api/stats/revenue-daily', self.revenue_daily)
+        app.router.add_get('/api/stats/revenue-by-source', self.revenue_by_source)
+        app.router.add_get('/api/health/db-info', self.db_info)
+        app.router.add_get('/api/payment/check/{order_id}', self.payment_check)
+        app.router.add_get('/api/payment/check-by-telegram/{telegram_id}', self.payment_check_by_telegram)
+        app.router.add_post('/api/tribute-pending/create', self.tribute_pending)
+        return app
+
+
+async def start_stub_backend(settings: Optional[StubSettings] = None,
+                             host: str = '127.0.0.1', port: int = 0):
+    """Start the stand-in in the running loop; returns (runner, base_url, backend)"""
+    backend = StubBackend(settings or StubSettings())
+    runner = web.AppRunner(backend.build_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}", backend
+
+
+def parse_routes(items) -> Dict[str, Dict]:
+    """'--route /api/stats/=lognormal:200:0.6,0.05' -> route overrides"""
+    routes = {}
+    for item in items or []:
+        prefix, spec = item.split('=', 1)
+        latency, _, error_rate = spec.partition(',')
+        override = {'latency': latency}
+        if error_rate:
+            override['error_rate'] = float(error_rate)
+        routes[prefix] = override
+    return routes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', default='fixed:0', help="e.g. lognormal:20:0.5")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--days', type=int, default=30, help="points in daily stats series")
+    parser.add_argument('--transactions', type=int, default=50)
+    parser.add_argument('--route', action='append', help="PREFIX=LATENCY[,ERROR_RATE]")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    settings = StubSettings(latency=args.latency, error_rate=args.error_rate, days=args.days,
+                            transactions=args.transactions, routes=parse_routes(args.route),
+                            seed=args.seed)
+    web.run_app(StubBackend(settings).build_app(), host=args.host, port=args.port)
@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+"""
+Synthetic update load harness for the real bot Application.
+
+Builds the Application from bot.main with every register_*_handlers
+registered, swaps the network Bot for a recording fake, points APIClient
+at the local stand-in backend and feeds synthetic Updates through
+Application.process_update.
+
+Reports updates/sec, per-handler p50/p99 latency, event-loop lag and the
+outgoing Bot API calls as JSON.
+
+Usage:
+    python -m benchmarks.update_load --workload mixed --updates 2000 --concurrency 64 \\
+        --latency lognormal:20:0.5 --output bench_update_load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import warnings
+from collections import Counter, defaultdict
+
+from benchmarks.stub_backend import StubSettings, start_stub_backend
+
+ADMIN_IDS = [900000001, 900000002, 900000003]
+LINKED_USER_BASE = 100000000
+NEW_USER_BASE = 500000000
+
+# Workload -> list of (weight, update kind)
+WORKLOADS = {
+    'start_storm': [(1, 'start_new'), (1, 'start_referral'), (1, 'start_returning')],
+    'balance_taps': [(3, 'balance_tap'), (1, 'back_to_start'), (1, 'balance_command')],
+    'admin_charts': [(2, 'admin_spending_chart'), (2, 'admin_revenue_chart'), (1, 'admin_user_stats')],
+    'mixed': [(4, 'start_returning'), (2, 'start_new'), (6, 'balance_tap'), (3, 'back_to_start'),
+              (1, 'admin_spending_chart'), (1, 'admin_user_stats')],
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values_ms):
+    return {
+        'count': len(values_ms),
+        'p50_ms': round(percentile(values_ms, 50), 3),
+        'p99_ms': round(percentile(values_ms, 99), 3),
+        'max_ms': round(max(values_ms), 3) if values_ms else 0.0,
+        'mean_ms': round(sum(values_ms) / len(values_ms), 3) if values_ms else 0.0,
+    }
+
+
+def prepare_environment(base_url: str, workdir: str):
+    """Configure the bot through env before any bot module is imported"""
+    os.environ.setdefault('BOT_TOKEN', '123456:benchmark')
+    os.environ['API_BASE_URL'] = base_url
+    os.environ['ADMIN_IDS'] = ','.join(str(admin_id) for admin_id in ADMIN_IDS)
+    os.environ['DATABASE_URL'] = f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['LOG_FILE'] = os.path.join(workdir, 'bench.log')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+
+def make_fake_bot(token: str):
+    """ExtBot that records outgoing calls instead of talking to Telegram"""
+    from telegram.ext import ExtBot
+
+    class RecordingBot(ExtBot):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            with self._unfrozen():
+                self.calls = Counter()
+                self.message_ids = iter(range(1, 10 ** 9))
+
+        async def _do_post(self, endpoint, data, **kwargs):
+            self.calls[endpoint] += 1
+
+            if endpoint == 'getMe':
+                return {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+
+            if endpoint in ('sendMessage', 'sendPhoto', 'editMessageText', 'editMessageCaption'):
+                message_id = next(self.message_ids)
+                chat_id = data.get('chat_id', 1)
+                message = {
+                    'message_id': data.get('message_id', message_id),
+                    'date': int(time.time()),
+                    'chat': {'id': chat_id, 'type': 'private'},
+                    'from': {'id': 1, 'is_bot': True, 'first_name': 'Bench'},
+                }
+                if endpoint == 'sendPhoto':
+                    message['photo'] = [{'file_id': f"photo-{message_id}",
+                                         'file_unique_id': f"u{message_id}",
+                                         'width': 1200, 'height': 600}]
+                else:
+                    message['text'] = data.get('text', '')
+                return message
+
+            return True
+
+    return RecordingBot(token=token)
+
+
+class UpdateFactory:
+    """Builds Telegram update payloads for each workload kind"""
+
+    def __init__(self, linked_users: int):
+        self.linked_users = linked_users
+        self.update_id = 0
+        self.new_user_id = NEW_USER_BASE
+
+    def _user(self, user_id):
+        return {'id': user_id, 'is_bot': False, 'first_name': f"User{user_id}", 'username': f"u{user_id}"}
+
+    def _message(self, user_id, text, entities=None):
+        message = {
+            'message_id': self.update_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': self._user(user_id),
+            'text': text,
+        }
+        if entities:
+            message['entities'] = entities
+        return message
+
+    def command(self, user_id, text):
+        self.update_id += 1
+        command_length = len(text.split()[0])
+        return {'update_id': self.update_id,
+                'message': self._message(user_id, text, [{'type': 'bot_command', 'offset': 0,
+                                                          'length': command_length}])}
+
+    def callback(self, user_id, data):
+        self.update_id += 1
+        bot_message = self._message(user_id, 'menu')
+        bot_message['from'] = {'id': 1, 'is_bot': True, 'first_name': 'Bench'}
+        return {'update_id': self.update_id,
+                'callback_query': {'id': str(self.update_id), 'from': self._user(user_id),
+                                   'chat_instance': str(user_id), 'data': data,
+                                   'message': bot_message}}
+
+    def linked_user(self):
+        return LINKED_USER_BASE + self.update_id % self.linked_users
+
+    def admin(self):
+        return ADMIN_IDS[self.update_id % len(ADMIN_IDS)]
+
+    def build(self, kind, referral_code):
+        if kind == 'start_new':
+            self.new_user_id += 1
+            return self.command(self.new_user_id, '/start')
+        if kind == 'start_referral':
+            self.new_user_id += 1
+            return self.command(self.new_user_id, f"/start {referral_code}")
+        if kind == 'start_returning':
+            return self.command(self.linked_user(), '/start')
+        if kind == 'balance_command':
+            return self.command(self.linked_user(), '/balance')
+        if kind == 'balance_tap':
+            return self.callback(self.linked_user(), 'balance')
+        if kind == 'back_to_start':
+            return self.callback(self.linked_user(), 'start')
+        if kind in ('admin_spending_chart', 'admin_revenue_chart', 'admin_user_stats'):
+            return self.callback(self.admin(), kind)
+        raise ValueError(f"Unknown update kind: {kind}")
+
+
+def instrument_handlers(application, timings):
+    """Wrap every handler callback to record its latency by name"""
+    from telegram.ext import ConversationHandler
+
+    def wrap(handler):
+        if isinstance(handler, ConversationHandler):
+            for inner in handler.entry_points + handler.fallbacks:
+                wrap(inner)
+            for state_handlers in handler.states.values():
+                for inner in state_handlers:
+                    wrap(inner)
+            return
+
+        callback = handler.callback
+        name = getattr(callback, '__qualname__', repr(callback))
+
+        async def timed(update, context, _callback=callback, _name=name):
+            started = time.perf_counter()
+            try:
+                return await _callback(update, context)
+            finally:
+                timings[_name].append((time.perf_counter() - started) * 1000)
+
+        handler.callback = timed
+
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            wrap(handler)
+
+
+async def monitor_loop_lag(samples, stop: asyncio.Event, interval: float = 0.01):
+    """Record how late the loop wakes up a sleeping task"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, (time.perf_counter() - started - interval) * 1000))
+
+
+async def seed_database(linked_users: int, referral_code: str):
+    from bot.database import db_manager, ReferralLink
+
+    async with db_manager.SessionLocal() as session:
+        session.add(ReferralLink(code=referral_code, name='Benchmark campaign'))
+        await session.commit()
+
+    for telegram_id in list(range(LINKED_USER_BASE, LINKED_USER_BASE + linked_users)) + ADMIN_IDS:
+        await db_manager.create_user(
+            telegram_id=telegram_id,
+            username=f"u{telegram_id}",
+            first_name=f"User{telegram_id}",
+            api_token=f"stub-{telegram_id}@bench",
+            api_user_id=f"user-{telegram_id}"
+        )
+
+
+async def run_benchmark(args):
+    workdir = tempfile.mkdtemp(prefix='bot-bench-')
+    runner, base_url, backend = await start_stub_backend(StubSettings(
+        latency=args.latency, error_rate=args.error_rate, days=args.days, seed=args.seed
+    ))
+    prepare_environment(base_url, workdir)
+
+    warnings.filterwarnings('ignore')
+    from telegram import Update
+    from bot.config import config
+    from bot.main import build_application
+
+    bot = make_fake_bot(config.BOT_TOKEN)
+    application = build_application(bot=bot)
+
+    timings = defaultdict(list)
+    instrument_handlers(application, timings)
+
+    errors = Counter()
+
+    async def count_errors(update, context):
+        errors[type(context.error).__name__] += 1
+
+    application.add_error_handler(count_errors)
+
+    referral_code = 'benchref'
+    await application.initialize()
+    await application.post_init(application)
+    await seed_database(args.linked_users, referral_code)
+
+    import random
+    random.seed(args.seed)
+    factory = UpdateFactory(args.linked_users)
+    weights, kinds = zip(*WORKLOADS[args.workload])
+    payloads = [factory.build(kind, referral_code)
+                for kind in random.choices(kinds, weights=weights, k=args.updates)]
+    updates = [Update.de_json(payload, bot) for payload in payloads]
+
+    bot.calls.clear()
+    backend.requests = 0
+    lag_samples = []
+    update_latencies = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(monitor_loop_lag(lag_samples, stop))
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def feed(update):
+        async with semaphore:
+            started = time.perf_counter()
+            await application.process_update(update)
+            update_latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(feed(update) for update in updates))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await lag_task
+
+    report = {
+        'workload': args.workload,
+        'updates': len(updates),
+        'concurrency': args.concurrency,
+        'backend_latency': args.latency,
+        'duration_s': round(elapsed, 3),
+        'updates_per_sec': round(len(updates) / elapsed, 1),
+        'update_latency': summarize(update_latencies),
+        'handlers': {name: summarize(values) for name, values in sorted(timings.items())},
+        'loop_lag': summarize(lag_samples),
+        'bot_calls': dict(bot.calls),
+        'backend_requests': backend.requests,
+        'errors': dict(errors),
+    }
+
+    await application.post_shutdown(application)
+    await application.shutdown()
+    await runner.cleanup()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workload', choices=sorted(WORKLOADS), default='mixed')
+    parser.add_argument('--updates', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--linked-users', type=int, default=200)
+    parser.add_argument('--latency', default='lognormal:20:0.5', help="stand-in backend latency")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(text)
+    else:
+        sys.stdout.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
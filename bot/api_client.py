@@ -1,11 +1,57 @@
 import aiohttp
 import asyncio
-from typing import Optional, Dict, Any, List
+import random
+import re
+from typing import Optional, Dict, Any, List, Tuple
 from bot.config import config
+from bot.utils.cache import TTLCache
+from bot.utils.circuit_breaker import CircuitBreaker
+from bot.utils import deadline
 import logging
 
 logger = logging.getLogger(__name__)
 
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+
+class APIError(Exception):
+    """Base class for FitnessTracker API errors"""
+
+
+class APIUnavailableError(APIError):
+    """Backend could not be reached or is unhealthy"""
+
+
+class APITimeoutError(APIUnavailableError):
+    """Request did not finish in time"""
+
+
+class APIConnectionError(APIUnavailableError):
+    """Connection to backend failed"""
+
+
+class CircuitOpenError(APIUnavailableError):
+    """Endpoint circuit is open, request was not sent"""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"API temporarily unavailable: {endpoint}")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class APIResponseError(APIError):
+    """Backend answered with an HTTP error status"""
+
+    def __init__(self, status: int, data: Any):
+        error = data.get('error', 'Unknown error') if isinstance(data, dict) else 'Unknown error'
+        super().__init__(f"API error: {error}")
+        self.status = status
+        self.data = data
+
+    @property
+    def retryable(self) -> bool:
+        return self.status >= 500
+
 
 class APIClient:
     """Client for FitnessTracker API"""
@@ -13,37 +59,221 @@ class APIClient:
     def __init__(self):
         self.base_url = config.API_BASE_URL
         self.timeout = aiohttp.ClientTimeout(total=config.API_TIMEOUT)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.balance_cache = TTLCache(config.BALANCE_CACHE_SIZE, config.BALANCE_CACHE_TTL)
+        self.last_known_balance = TTLCache(config.BALANCE_CACHE_SIZE, config.BALANCE_STALE_TTL)
+        self.analytics_cache = TTLCache(config.ANALYTICS_CACHE_SIZE, config.ANALYTICS_CACHE_TTL)
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        # Bumped by invalidate_balance so responses fetched before it are not cached
+        self._balance_generations: Dict[int, int] = {}
+        self._analytics_generation = 0
+        self.coalesced_requests = 0
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    async def start(self):
+        """Open the shared HTTP session (called from post_init)"""
+        if self._session is not None and not self._session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=config.API_POOL_LIMIT,
+            limit_per_host=config.API_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=config.API_DNS_CACHE_TTL,
+            keepalive_timeout=config.API_KEEPALIVE_TIMEOUT
+        )
+        self._session = aiohttp.ClientSession(timeout=self.timeout, connector=connector)
+        logger.info(f"API session opened: limit={config.API_POOL_LIMIT}, "
+                    f"per_host={config.API_POOL_LIMIT_PER_HOST}")
+
+    async def close(self):
+        """Close the shared HTTP session (called on shutdown)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("API session closed")
+        self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session, opening it lazily if needed"""
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    @staticmethod
+    def _coalesce_key(method: str, url: str, headers: Optional[Dict], params: Optional[Dict]) -> tuple:
+        """Identity of a request for single-flight sharing"""
+        auth = (headers or {}).get('Authorization')
+        query = tuple(sorted((params or {}).items()))
+        return method, url, query, auth
 
     async def _request(self, method: str, endpoint: str,
                        headers: Optional[Dict] = None,
                        json_data: Optional[Dict] = None,
                        params: Optional[Dict] = None) -> Dict[Any, Any]:
-        """Make API request"""
-        url = f"{self.base_url}{endpoint}"
+        """Make API request
+
+        Concurrent identical GETs share one in-flight request and receive
+        the same (read-only) result.
+        """
+        if method != 'GET' or json_data is not None:
+            return await self._send(method, endpoint, headers, json_data, params)
+
+        key = self._coalesce_key(method, f"{self.base_url}{endpoint}", headers, params)
+        return await self._single_flight(
+            key, lambda: self._send(method, endpoint, headers, json_data, params)
+        )
+
+    async def _single_flight(self, key: tuple, factory):
+        """Share one in-flight coroutine between concurrent callers with the same key"""
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced_requests += 1
+            return await asyncio.shield(inflight)
+
+        task = asyncio.ensure_future(factory())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish_inflight(key, done))
+        return await asyncio.shield(task)
+
+    def _finish_inflight(self, key: tuple, task: asyncio.Future):
+        """Forget a completed shared request"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark exception as retrieved when every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    @staticmethod
+    def _endpoint_key(endpoint: str) -> str:
+        """Endpoint path without query string and numeric ids"""
+        path = endpoint.split('?', 1)[0]
+        return re.sub(r'/\d+(?=/|$)', '/{id}', path)
+
+    def _breaker(self, endpoint: str) -> CircuitBreaker:
+        key = self._endpoint_key(endpoint)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(config.API_BREAKER_FAILURES, config.API_BREAKER_RESET)
+            self._breakers[key] = breaker
+        return breaker
+
+    @staticmethod
+    def _endpoint_timeout(endpoint: str) -> float:
+        """Timeout profile for endpoint: longest matching prefix from config"""
+        path = endpoint.split('?', 1)[0]
+        matches = [prefix for prefix in config.API_TIMEOUT_PROFILES if path.startswith(prefix)]
+        if not matches:
+            return float(config.API_TIMEOUT)
+        return config.API_TIMEOUT_PROFILES[max(matches, key=len)]
+
+    def _request_timeout(self, endpoint: str) -> Tuple[float, bool]:
+        """Endpoint timeout capped by what is left of the update deadline
+
+        Returns (timeout, capped); capped is True when the deadline, not
+        the endpoint profile, sets the limit.
+        """
+        timeout = self._endpoint_timeout(endpoint)
+        left = deadline.remaining()
+        if left is not None:
+            if left <= 0:
+                raise APITimeoutError(f"Update deadline exceeded before {endpoint}")
+            if left < timeout:
+                return left, True
+        return timeout, False
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Full-jitter exponential backoff delay"""
+        cap = min(config.API_RETRY_BACKOFF_MAX, config.API_RETRY_BACKOFF_BASE * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    async def _send(self, method: str, endpoint: str,
+                    headers: Optional[Dict] = None,
+                    json_data: Optional[Dict] = None,
+                    params: Optional[Dict] = None) -> Dict[Any, Any]:
+        """Send request with idempotent-only retries behind a circuit breaker"""
+        breaker = self._breaker(endpoint)
+        attempts = 1 + (config.API_RETRY_ATTEMPTS if method in IDEMPOTENT_METHODS else 0)
+
+        for attempt in range(attempts):
+            # An exhausted update budget is raised here, before the breaker:
+            # nothing was sent, so it must not count as a backend failure
+            timeout, capped = self._request_timeout(endpoint)
+            if not breaker.allow():
+                logger.warning(f"API circuit open: {self._endpoint_key(endpoint)}")
+                raise CircuitOpenError(self._endpoint_key(endpoint), breaker.retry_after())
 
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
             try:
-                async with session.request(
-                        method,
-                        url,
-                        headers=headers,
-                        json=json_data,
-                        params=params
-                ) as response:
-                    data = await response.json()
-
-                    if response.status >= 400:
-                        logger.error(f"API error: {response.status} - {data}")
-                        raise Exception(f"API error: {data.get('error', 'Unknown error')}")
-
-                    return data
-
-            except asyncio.TimeoutError:
-                logger.error(f"API timeout: {endpoint}")
-                raise Exception("API request timeout")
-            except Exception as e:
-                logger.error(f"API request failed: {e}")
+                data = await self._send_once(method, endpoint, timeout, headers, json_data, params)
+            except APIResponseError as e:
+                if not e.retryable:
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+            except APITimeoutError:
+                if capped:
+                    # Our own budget ran out, not the endpoint's timeout
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+            except APIUnavailableError:
+                breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+            except BaseException:
+                # Cancelled or unexpected error: no verdict on the backend, but a
+                # half-open circuit must not keep waiting for this probe
+                breaker.release()
                 raise
+            else:
+                breaker.record_success()
+                return data
+
+            delay = self._backoff(attempt)
+            left = deadline.remaining()
+            if left is not None and left <= delay:
+                raise APITimeoutError(f"Update deadline exceeded retrying {endpoint}")
+            logger.warning(f"Retrying {method} {endpoint} in {delay:.2f}s "
+                           f"(attempt {attempt + 2}/{attempts})")
+            await asyncio.sleep(delay)
+
+    async def _send_once(self, method: str, endpoint: str, timeout: float,
+                         headers: Optional[Dict] = None,
+                         json_data: Optional[Dict] = None,
+                         params: Optional[Dict] = None) -> Dict[Any, Any]:
+        """Send a single HTTP request over the shared session"""
+        url = f"{self.base_url}{endpoint}"
+        session = await self._get_session()
+
+        try:
+            async with session.request(
+                    method,
+                    url,
+                    headers=headers,
+                    json=json_data,
+                    params=params,
+                    timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                try:
+                    data = await response.json(content_type=None)
+                except ValueError:
+                    data = {}
+
+                if response.status >= 400:
+                    logger.error(f"API error: {response.status} - {data}")
+                    raise APIResponseError(response.status, data)
+
+                return data
+
+        except asyncio.TimeoutError:
+            logger.error(f"API timeout: {endpoint} ({timeout:.1f}s)")
+            raise APITimeoutError("API request timeout")
+        except aiohttp.ClientError as e:
+            logger.error(f"API connection failed: {endpoint} - {e}")
+            raise APIConnectionError(f"API connection failed: {e}")
 
     # Authentication
     async def send_verification_code(self, email: str) -> bool:
@@ -82,35 +312,91 @@ class APIClient:
         )
 
     # Coins management
-    async def get_balance(self, token: str) -> Dict:
-        """Get user's coin balance"""
-        return await self._request(
-            'GET',
-            '/api/lw-coin/balance',
-            headers={'Authorization': f'Bearer {token}'}
-        )
+    async def get_balance(self, token: str, telegram_id: Optional[int] = None) -> Dict:
+        """Get user's coin balance (cached per telegram_id when given)"""
+        if telegram_id is None:
+            return await self._request(
+                'GET',
+                '/api/lw-coin/balance',
+                headers={'Authorization': f'Bearer {token}'}
+            )
 
-    async def set_balance(self, token: str, amount: int, source: str = 'manual') -> Dict:
-        """Set user's coin balance (admin)"""
-        return await self._request(
-            'POST',
-            '/api/lw-coin/set-balance',
-            headers={'Authorization': f'Bearer {token}'},
-            json_data={'amount': amount, 'source': source}
-        )
+        cached = self.balance_cache.get(telegram_id)
+        if cached is not None:
+            return cached
+
+        generation = self._balance_generations.get(telegram_id, 0)
+
+        async def fetch():
+            balance = await self._send(
+                'GET',
+                '/api/lw-coin/balance',
+                headers={'Authorization': f'Bearer {token}'}
+            )
+            # A purchase or balance change finished while this was in flight
+            if self._balance_generations.get(telegram_id, 0) == generation:
+                self.balance_cache.set(telegram_id, balance)
+                self.last_known_balance.set(telegram_id, balance)
+            return balance
+
+        return await self._single_flight(('balance', telegram_id), fetch)
+
+    def peek_balance(self, telegram_id: int) -> Tuple[Optional[Dict], bool]:
+        """Return (balance, is_fresh) without a backend call
+
+        Falls back to the last known (possibly stale) balance when the fresh
+        cache entry has expired or was invalidated.
+        """
+        fresh = self.balance_cache.get(telegram_id)
+        if fresh is not None:
+            return fresh, True
+        return self.last_known_balance.get(telegram_id), False
 
-    async def purchase_subscription(self, token: str, coins: int, days: int, price: float) -> Dict:
+    def invalidate_balance(self, telegram_id: Optional[int]):
+        """Drop cached balance after it was changed
+
+        Requests already in flight keep running for their callers but no
+        longer cache their result, and later callers start a fresh request.
+        """
+        if telegram_id is not None:
+            self._balance_generations[telegram_id] = self._balance_generations.get(telegram_id, 0) + 1
+            self._inflight.pop(('balance', telegram_id), None)
+            self.balance_cache.invalidate(telegram_id)
+
+    async def set_balance(self, token: str, amount: int, source: str = 'manual',
+                          telegram_ids: List[int] = ()) -> Dict:
+        """Set user's coin balance (admin)
+
+        telegram_ids: every bot user linked to the account, so none of them
+        keeps showing the old balance.
+        """
+        try:
+            return await self._request(
+                'POST',
+                '/api/lw-coin/set-balance',
+                headers={'Authorization': f'Bearer {token}'},
+                json_data={'amount': amount, 'source': source}
+            )
+        finally:
+            for telegram_id in telegram_ids:
+                self.invalidate_balance(telegram_id)
+
+    async def purchase_subscription(self, token: str, coins: int, days: int, price: float,
+                                    telegram_id: Optional[int] = None) -> Dict:
         """Purchase subscription with coins"""
-        return await self._request(
-            'POST',
-            '/api/lw-coin/purchase-subscription',
-            headers={'Authorization': f'Bearer {token}'},
-            json_data={
-                'coinsAmount': coins,
-                'durationDays': days,
-                'price': price
-            }
-        )
+        try:
+            return await self._request(
+                'POST',
+                '/api/lw-coin/purchase-subscription',
+                headers={'Authorization': f'Bearer {token}'},
+                json_data={
+                    'coinsAmount': coins,
+                    'durationDays': days,
+                    'price': price
+                }
+            )
+        finally:
+            self.invalidate_balance(telegram_id)
 
     async def get_transactions(self, token: str) -> List[Dict]:
         """Get user's coin transactions"""
@@ -128,6 +414,49 @@ class APIClient:
             '/api/stats/user',
             headers={'Authorization': f'Bearer {token}'}
         )
+
+    # Admin analytics
+    async def get_analytics(self, endpoint: str, token: Optional[str] = None) -> Dict:
+        """Get aggregate stats shared by all admins, cached per endpoint TTL
+
+        Results do not depend on which admin asks, so the cache key is the
+        endpoint alone and concurrent misses share one backend call.
+        """
+        cached = self.analytics_cache.get(endpoint)
+        if cached is not None:
+            return cached
+
+        generation = self._analytics_generation
+
+        async def fetch():
+            data = await self._send(
+                'GET',
+                endpoint,
+                headers={'Authorization': f'Bearer {token}'} if token else None
+            )
+            # The admin pressed refresh while this was in flight
+            if self._analytics_generation == generation:
+                self.analytics_cache.set(endpoint, data, ttl=self._analytics_ttl(endpoint))
+            return data
+
+        return await self._single_flight(('analytics', endpoint), fetch)
+
+    @staticmethod
+    def _analytics_ttl(endpoint: str) -> float:
+        path = endpoint.split('?', 1)[0]
+        return config.ANALYTICS_CACHE_TTLS.get(path, config.ANALYTICS_CACHE_TTL)
+
+    def invalidate_analytics(self):
+        """Drop all cached analytics (admin "refresh" button)
+
+        Fetches already in flight are not cached and not joined by later
+        callers, so the refresh cannot be undone by pre-refresh data.
+        """
+        self._analytics_generation += 1
+        for key in [key for key in self._inflight if key[0] == 'analytics']:
+            del self._inflight[key]
+        self.analytics_cache.clear()
+
     async def check_payment_status(self, order_id: str) -> Dict:
         """Check payment status"""
         return await self._request(
@@ -1,18 +1,32 @@
+import logging
 import os
 from typing import List
-from dotenv import load_dotenv
 from pathlib import Path
 
-# Load environment variables
+# Load environment variables (python-dotenv is only imported when there is a .env)
 env_path = Path(__file__).parent.parent / '.env'
-print(f"🔍 Loading .env from: {env_path}")
-print(f"📁 .env exists: {env_path.exists()}")
+if env_path.exists():
+    from dotenv import load_dotenv
+    load_dotenv(env_path)
 
-load_dotenv(env_path)
 
-# ✅ ПРОВЕРЯЕМ ЧТО ТОКЕН ЗАГРУЗИЛСЯ
-bot_token = os.getenv('BOT_TOKEN')
-print(f"🔑 BOT_TOKEN loaded: {bot_token[:10] if bot_token else 'NOT FOUND'}...")
+def log_environment():
+    """Log where configuration came from (called once logging is set up)"""
+    logger = logging.getLogger(__name__)
+    bot_token = os.getenv('BOT_TOKEN')
+    logger.info(f"🔍 .env: {env_path} (exists: {env_path.exists()})")
+    logger.info(f"🔑 BOT_TOKEN loaded: {bot_token[:10] if bot_token else 'NOT FOUND'}...")
+
+
+def _parse_timeout_profiles(raw: str) -> dict:
+    """Parse 'prefix=seconds;prefix=seconds' into a dict"""
+    profiles = {}
+    for item in raw.split(';'):
+        if '=' not in item:
+            continue
+        prefix, seconds = item.rsplit('=', 1)
+        profiles[prefix.strip()] = float(seconds)
+    return profiles
 
 
 class Config:
@@ -32,9 +46,105 @@ class Config:
     API_BASE_URL = os.getenv('API_BASE_URL', 'http://api.lightweightfit.com:60170')
     API_TIMEOUT = int(os.getenv('API_TIMEOUT', 30))
 
+    # Per-endpoint timeouts (longest matching prefix wins, API_TIMEOUT otherwise)
+    API_TIMEOUT_PROFILES = {
+        '/api/lw-coin/balance': 5.0,
+        '/api/lw-coin/': 10.0,
+        '/api/auth/': 10.0,
+        '/api/user/': 10.0,
+        '/api/payment/': 10.0,
+        '/api/health/': 10.0,
+        '/api/stats/': 20.0,
+        **_parse_timeout_profiles(os.getenv('API_TIMEOUT_PROFILES', ''))
+    }
+
+    # Total time budget for all backend calls made while handling one update
+    UPDATE_DEADLINE = float(os.getenv('UPDATE_DEADLINE', 20))
+
+    # API connection pool
+    API_POOL_LIMIT = int(os.getenv('API_POOL_LIMIT', 100))
+    API_POOL_LIMIT_PER_HOST = int(os.getenv('API_POOL_LIMIT_PER_HOST', 20))
+    API_DNS_CACHE_TTL = int(os.getenv('API_DNS_CACHE_TTL', 300))
+    API_KEEPALIVE_TIMEOUT = float(os.getenv('API_KEEPALIVE_TIMEOUT', 30))
+
+    # API retries and circuit breaker
+    API_RETRY_ATTEMPTS = int(os.getenv('API_RETRY_ATTEMPTS', 2))
+    API_RETRY_BACKOFF_BASE = float(os.getenv('API_RETRY_BACKOFF_BASE', 0.2))
+    API_RETRY_BACKOFF_MAX = float(os.getenv('API_RETRY_BACKOFF_MAX', 2.0))
+    API_BREAKER_FAILURES = int(os.getenv('API_BREAKER_FAILURES', 5))
+    API_BREAKER_RESET = float(os.getenv('API_BREAKER_RESET', 30))
+
+    # Admin dashboards: max wait for all concurrent data sources
+    ADMIN_STATS_TIMEOUT = float(os.getenv('ADMIN_STATS_TIMEOUT', 10))
+
+    # Balance cache
+    BALANCE_CACHE_TTL = float(os.getenv('BALANCE_CACHE_TTL', 30))
+    BALANCE_CACHE_SIZE = int(os.getenv('BALANCE_CACHE_SIZE', 10000))
+    # How long a last known balance may be shown while a fresh one loads
+    BALANCE_STALE_TTL = float(os.getenv('BALANCE_STALE_TTL', 86400))
+
+    # Admin analytics cache (seconds), per endpoint path with a default
+    ANALYTICS_CACHE_TTL = float(os.getenv('ANALYTICS_CACHE_TTL', 120))
+    ANALYTICS_CACHE_SIZE = int(os.getenv('ANALYTICS_CACHE_SIZE', 256))
+    ANALYTICS_CACHE_TTLS = {
+        '/api/stats/coin-spending-daily': float(os.getenv('ANALYTICS_TTL_SPENDING', 300)),
+        '/api/stats/revenue-daily': float(os.getenv('ANALYTICS_TTL_REVENUE', 300)),
+        '/api/stats/revenue-by-source': float(os.getenv('ANALYTICS_TTL_REVENUE_BY_SOURCE', 300)),
+        '/api/health/db-info': float(os.getenv('ANALYTICS_TTL_DB_INFO', 60))
+    }
+
+    # /start replies with the last known balance and refreshes it in background
+    START_STALE_WHILE_REVALIDATE = os.getenv('START_STALE_WHILE_REVALIDATE', 'true').lower() == 'true'
+
     # Database
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite+aiosqlite:///./bot_database.db')
 
+    # Connection pool (ignored for in-memory SQLite)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+
+    # Write-behind User.last_active tracking
+    ACTIVITY_FLUSH_INTERVAL = float(os.getenv('ACTIVITY_FLUSH_INTERVAL', 30))
+    ACTIVITY_FLUSH_BATCH = int(os.getenv('ACTIVITY_FLUSH_BATCH', 500))
+
+    # Group-commit LwCoinTransaction writer (bot.utils.ledger)
+    LEDGER_BATCH_SIZE = int(os.getenv('LEDGER_BATCH_SIZE', 200))
+    LEDGER_FLUSH_INTERVAL = float(os.getenv('LEDGER_FLUSH_INTERVAL', 0.05))
+
+    # Chart rendering process pool (bot.utils.chart_service)
+    CHART_WORKERS = int(os.getenv('CHART_WORKERS', 2))
+    CHART_MAX_QUEUE = int(os.getenv('CHART_MAX_QUEUE', 8))
+    CHART_RENDER_TIMEOUT = float(os.getenv('CHART_RENDER_TIMEOUT', 30))
+    # Points drawn per time series; longer series are downsampled (LTTB / min-max)
+    CHART_MAX_POINTS = int(os.getenv('CHART_MAX_POINTS', 300))
+    # Rendered charts + Telegram file_ids keyed by input hash
+    CHART_CACHE_SIZE = int(os.getenv('CHART_CACHE_SIZE', 64))
+    CHART_CACHE_MAX_BYTES = int(os.getenv('CHART_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+
+    # Tribute webhook idempotency: recently completed transaction_ids
+    TRIBUTE_PROCESSED_CACHE_SIZE = int(os.getenv('TRIBUTE_PROCESSED_CACHE_SIZE', 10000))
+    TRIBUTE_PROCESSED_CACHE_TTL = float(os.getenv('TRIBUTE_PROCESSED_CACHE_TTL', 86400))
+
+    # Buffered referral click/registration counters (bot.utils.tracking)
+    REFERRAL_FLUSH_INTERVAL = float(os.getenv('REFERRAL_FLUSH_INTERVAL', 5))
+    # Referral codes confirmed to exist (skips the lookup for unregistered clicks)
+    REFERRAL_CODE_CACHE_SIZE = int(os.getenv('REFERRAL_CODE_CACHE_SIZE', 10000))
+    REFERRAL_CODE_CACHE_TTL = float(os.getenv('REFERRAL_CODE_CACHE_TTL', 3600))
+
+    # In-process cache of user identity records (db_manager.get_user_record)
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 50000))
+    USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 300))
+
+    # SQLite tuning applied on every new connection
+    SQLITE_TUNING = os.getenv('SQLITE_TUNING', 'true').lower() == 'true'
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', -64000))  # negative = KiB
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))  # ms
+    SQLITE_TEMP_STORE = os.getenv('SQLITE_TEMP_STORE', 'MEMORY')
+
     # Payment
     TRIBUTE_API_KEY = os.getenv('TRIBUTE_API_KEY')
     TRIBUTE_WEBHOOK_SECRET = os.getenv('TRIBUTE_WEBHOOK_SECRET')
@@ -1,10 +1,11 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Float, Text, select
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Float, Text, Index, select, event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
 from datetime import datetime
 import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, NamedTuple
 from bot.config import config
+from bot.utils.cache import TTLCache
 
 Base = declarative_base()
 
@@ -39,6 +40,11 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
     is_banned = Column(Boolean, default=False)
 
+    __table_args__ = (
+        # Weekly active users in admin stats
+        Index('ix_bot_users_last_active', 'last_active'),
+    )
+
 
 class Payment(Base):
     __tablename__ = 'payments'
@@ -61,6 +67,13 @@ class Payment(Base):
 
     payment_metadata = Column(Text)  # JSON string
 
+    __table_args__ = (
+        # Latest pending payment lookup in Tribute webhook
+        Index('ix_payments_tg_package_status_created', 'telegram_id', 'package_id', 'status', 'created_at'),
+        # Revenue totals in admin stats (covers amount)
+        Index('ix_payments_status_completed_amount', 'status', 'completed_at', 'amount'),
+    )
+
 
 class ReferralLink(Base):
     __tablename__ = 'referral_links'
@@ -81,6 +94,11 @@ class ReferralLink(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
 
+    __table_args__ = (
+        # Active links list, newest first
+        Index('ix_referral_links_active_created', 'is_active', 'created_at'),
+    )
+
 
 class LwCoinTransaction(Base):
     __tablename__ = 'lw_coin_transactions'
@@ -99,15 +117,81 @@ class LwCoinTransaction(Base):
     date = Column(String(10))
 
 
+class DailyStats(Base):
+    """Per-day rollup maintained incrementally by the write paths"""
+    __tablename__ = 'daily_stats'
+
+    date = Column(String(10), primary_key=True)  # YYYY-MM-DD (UTC)
+
+    new_users = Column(Integer, default=0, nullable=False)
+    payments = Column(Integer, default=0, nullable=False)
+    revenue = Column(Float, default=0.0, nullable=False)
+
+    coin_transactions = Column(Integer, default=0, nullable=False)
+    coins_spent = Column(Integer, default=0, nullable=False)
+    coins_credited = Column(Integer, default=0, nullable=False)
+
+
+class UserRecord(NamedTuple):
+    """Compact read-only view of a user for handlers that don't modify it"""
+    id: int
+    telegram_id: int
+    api_token: Optional[str]
+    api_user_id: Optional[str]
+    is_banned: bool
+    referred_by: Optional[str]
+
+
+def _sqlite_pragmas() -> list:
+    """PRAGMA statements for the configured SQLite performance profile"""
+    def keyword(value: str) -> str:
+        value = str(value).upper()
+        if not value.isalpha():
+            raise ValueError(f"Invalid SQLite pragma value: {value}")
+        return value
+
+    return [
+        f"PRAGMA journal_mode={keyword(config.SQLITE_JOURNAL_MODE)}",
+        f"PRAGMA synchronous={keyword(config.SQLITE_SYNCHRONOUS)}",
+        f"PRAGMA mmap_size={int(config.SQLITE_MMAP_SIZE)}",
+        f"PRAGMA cache_size={int(config.SQLITE_CACHE_SIZE)}",
+        f"PRAGMA busy_timeout={int(config.SQLITE_BUSY_TIMEOUT)}",
+        f"PRAGMA temp_store={keyword(config.SQLITE_TEMP_STORE)}",
+    ]
+
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    """Pool sizing; in-memory SQLite uses a static pool without these options"""
+    if url.startswith('sqlite') and (':memory:' in url or url.rstrip('/').endswith(':')):
+        return {}
+    return {
+        'pool_size': config.DB_POOL_SIZE,
+        'max_overflow': config.DB_MAX_OVERFLOW,
+        'pool_timeout': config.DB_POOL_TIMEOUT
+    }
+
+
 # Database manager
 class DatabaseManager:
     def __init__(self):
-        self.engine = create_async_engine(config.DATABASE_URL)
+        self.engine = create_async_engine(config.DATABASE_URL, **_engine_options(config.DATABASE_URL))
+
+        if self.engine.dialect.name == 'sqlite' and config.SQLITE_TUNING:
+            pragmas = _sqlite_pragmas()
+
+            @event.listens_for(self.engine.sync_engine, 'connect')
+            def apply_sqlite_pragmas(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+                cursor.close()
+
         self.SessionLocal = sessionmaker(
             self.engine,
             class_=AsyncSession,
             expire_on_commit=False
         )
+        self.user_cache = TTLCache(config.USER_CACHE_SIZE, config.USER_CACHE_TTL)
 
     async def init_db(self):
         """Initialize database with all tables"""
@@ -127,13 +211,68 @@ class DatabaseManager:
             )
             return result.scalar_one_or_none()
 
+    async def get_user_record(self, telegram_id: int) -> Optional[UserRecord]:
+        """Get cached identity record by telegram ID (read-only)"""
+        record = self.user_cache.get(telegram_id)
+        if record is not None:
+            return record
+
+        async with self.SessionLocal() as session:
+            result = await session.execute(
+                select(*(getattr(User, field) for field in UserRecord._fields))
+                .where(User.telegram_id == telegram_id)
+            )
+            row = result.first()
+
+        if row is None:
+            return None
+
+        record = UserRecord(*row)
+        self.user_cache.set(telegram_id, record)
+        return record
+
+    def invalidate_user(self, *telegram_ids: Optional[int]):
+        """Drop cached identity records after a write"""
+        for telegram_id in telegram_ids:
+            if telegram_id is not None:
+                self.user_cache.invalidate(telegram_id)
+
+    async def get_telegram_ids_by_email(self, email: str) -> List[int]:
+        """Telegram IDs of every bot user linked to email"""
+        async with self.SessionLocal() as session:
+            result = await session.execute(
+                select(User.telegram_id).where(User.email == email)
+            )
+            return list(result.scalars())
+
+    async def bump_daily_stats(self, executor, day: str, **deltas):
+        """Add deltas to a DailyStats row inside the caller's transaction
+
+        `executor` is an AsyncSession or AsyncConnection; the row is created
+        on first use with an upsert, so concurrent writers never collide.
+        """
+        if self.engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        table = DailyStats.__table__
+        stmt = insert(table).values(date=day, **deltas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.date],
+            set_={name: table.c[name] + stmt.excluded[name] for name in deltas}
+        )
+        await executor.execute(stmt)
+
     async def create_user(self, telegram_id: int, **kwargs) -> User:
         """Create new user"""
         async with self.SessionLocal() as session:
             user = User(telegram_id=telegram_id, **kwargs)
             session.add(user)
+            await self.bump_daily_stats(session, datetime.utcnow().strftime('%Y-%m-%d'), new_users=1)
             await session.commit()
-            return user
+        self.invalidate_user(telegram_id)
+        return user
 
 
 db_manager = DatabaseManager()
\ No newline at end of file
@@ -1,13 +1,20 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, CommandHandler, CallbackQueryHandler, MessageHandler, filters, \
     ConversationHandler
-from bot.database import db_manager, User, Payment, ReferralLink
+from telegram.error import BadRequest
+from bot.database import db_manager, User, ReferralLink
 from bot.api_client import api_client
 from bot.config import config
-from bot.utils.charts import generate_spending_chart, generate_revenue_chart
+from bot.utils.fanout import fan_out
+from bot.utils.tracking import referral_counters
+from bot.utils.rollups import get_totals, get_day, today_key
+from bot.utils.analytics import ledger_analytics
+from bot.utils.chart_service import chart_service, ChartQueueFullError
+from bot.utils.charts_api import (
+    generate_spending_chart_from_server_data, generate_revenue_chart_from_server_data, generate_feature_usage_chart
+)
 from datetime import datetime, timedelta
 import logging
-import os
 from sqlalchemy import select, func
 import uuid
 
@@ -35,6 +42,7 @@ async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         [InlineKeyboardButton("🔗 Создать реф. ссылку", callback_data="admin_create_referral")],
         [InlineKeyboardButton("📋 Список реф. ссылок", callback_data="admin_list_referrals")],
         [InlineKeyboardButton("👥 Статистика пользователей", callback_data="admin_user_stats")],
+        [InlineKeyboardButton("🔄 Обновить аналитику", callback_data="admin_refresh_analytics")],
         [InlineKeyboardButton("🔙 Назад", callback_data="start")]
     ]
 
@@ -48,48 +56,63 @@ async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+async def _scalar(stmt):
+    """Run a single aggregate query in its own session"""
+    async with db_manager.SessionLocal() as session:
+        result = await session.execute(stmt)
+        return result.scalar()
+
+
 async def get_admin_stats():
     """Get admin statistics with beautiful formatting"""
-    async with db_manager.SessionLocal() as session:
-        total_users = await session.execute(select(func.count(User.id)))
-        total_users = total_users.scalar()
+    week_ago = datetime.utcnow() - timedelta(days=7)
 
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        active_users = await session.execute(
+    # Totals come from the daily_stats rollup; distinct weekly actives can't
+    # be summed per day, so they stay an index range count on last_active
+    results, errors = await fan_out({
+        'totals': get_totals,
+        'active_users': lambda: _scalar(
             select(func.count(User.id)).where(User.last_active >= week_ago)
-        )
-        active_users = active_users.scalar()
+        ),
+        'today': lambda: get_day(today_key())
+    }, timeout=config.ADMIN_STATS_TIMEOUT)
 
-        total_payments = await session.execute(
-            select(func.sum(Payment.amount)).where(Payment.status == 'completed')
-        )
-        total_revenue = total_payments.scalar() or 0
+    stats = dict(results.get('totals', {}))
+    if 'active_users' in results:
+        stats['active_users'] = results['active_users']
+    if 'today' in results:
+        stats['today_revenue'] = results['today']['revenue']
 
-        today = datetime.utcnow().date()
-        today_payments = await session.execute(
-            select(func.sum(Payment.amount))
-            .where(Payment.status == 'completed')
-            .where(func.date(Payment.completed_at) == today)
-        )
-        today_revenue = today_payments.scalar() or 0
+    # Escape special characters for MarkdownV2
+    def escape_md(text):
+        special_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
+        for char in special_chars:
+            text = str(text).replace(char, f'\\{char}')
+        return text
 
-        # Escape special characters for MarkdownV2
-        def escape_md(text):
-            special_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
-            for char in special_chars:
-                text = str(text).replace(char, f'\\{char}')
-            return text
+    def count(name):
+        return stats[name] if name in stats else '—'
+
+    def money(name):
+        if name not in stats:
+            return '—'
+        return escape_md(f'{stats[name] or 0:.2f}')
 
-        return f"""⚙️ *Админ панель*
+    text = f"""⚙️ *Админ панель*
 
 📊 *Статистика:*
 
-👥 *Всего пользователей:* `{total_users}`
-🟢 *Активных \\(7 дней\\):* `{active_users}`
+👥 *Всего пользователей:* `{count('total_users')}`
+🟢 *Активных \\(7 дней\\):* `{count('active_users')}`
 
 💰 *Финансы:*
-💵 Общий доход: `{escape_md(f'{total_revenue:.2f}')} €`
-📅 Доход сегодня: `{escape_md(f'{today_revenue:.2f}')} €`"""
+💵 Общий доход: `{money('total_revenue')} €`
+📅 Доход сегодня: `{money('today_revenue')} €`"""
+
+    if errors:
+        text += "\n\n⚠️ _Часть данных временно недоступна_"
+
+    return text
 
 
 async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -152,6 +175,16 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
         await show_user_stats(query.message)
         return ConversationHandler.END
 
+    elif query.data == "admin_refresh_analytics":
+        api_client.invalidate_analytics()
+        logger.info(f"Analytics cache cleared by admin {user.id}")
+        keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data="admin")]]
+        await query.message.reply_text(
+            "🔄 Кэш аналитики сброшен\n\nСледующий запрос графиков и статистики получит свежие данные",
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+        return ConversationHandler.END
+
     return ConversationHandler.END
 
 
@@ -268,7 +301,8 @@ async def set_user_coins_amount(update: Update, context: ContextTypes.DEFAULT_TY
             token = auth_result['accessToken']
 
             # Set balance
-            await api_client.set_balance(token, coins, 'admin')
+            telegram_ids = await db_manager.get_telegram_ids_by_email(email)
+            await api_client.set_balance(token, coins, 'admin', telegram_ids=telegram_ids)
 
             def escape_md(text):
                 special_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.',
@@ -382,10 +416,72 @@ async def create_referral_link(update: Update, context: ContextTypes.DEFAULT_TYP
     return ConversationHandler.END
 
 
-async def send_spending_chart(message):
+async def _reply_chart(message, generate, *args, **reply_kwargs):
+    """Send a chart, reusing the cached Telegram file_id or PNG for identical input"""
+    cache = chart_service.cache
+    key = cache.key(generate.__name__, *args)
+    entry = cache.get(key)
+
+    if entry and entry.file_id:
+        try:
+            return await message.reply_photo(photo=entry.file_id, **reply_kwargs)
+        except BadRequest as e:
+            logger.warning(f"Cached chart file_id rejected, uploading again: {e}")
+
+    png = entry.png if entry else await chart_service.shared(key, lambda: generate(*args))
+    sent = await message.reply_photo(photo=png, **reply_kwargs)
+    cache.set(key, png, file_id=sent.photo[-1].file_id if sent and sent.photo else None)
+    return sent
+
+
+async def _fetch_server_spending(message, user_id):
+    """Daily spending from the backend; replies with the error and returns None on failure"""
+    admin_user = await db_manager.get_user_record(user_id)
+
+    if not admin_user:
+        logger.error(f"❌ Admin user {user_id} not found in DB")
+        await message.reply_text("❌ Админ не найден. Сначала свяжите аккаунт через email")
+        return None
+
+    if not admin_user.api_token:
+        logger.error(f"❌ Admin user {user_id} has no API token")
+        await message.reply_text(
+            "❌ Аккаунт не привязан.\n"
+            "Используйте кнопку '🔗 Связать аккаунт' в главном меню"
+        )
+        return None
+
+    logger.info(f"✅ Found admin with token, requesting data from server...")
+
     try:
-        from bot.api_client import api_client
+        stats_response = await api_client.get_analytics(
+            '/api/stats/coin-spending-daily?days=30',
+            admin_user.api_token
+        )
+    except Exception as api_error:
+        logger.error(f"API request failed: {api_error}")
+        await message.reply_text(f"❌ Ошибка API: {str(api_error)}")
+        return None
+
+    if not stats_response:
+        logger.warning("Empty response from API")
+        await message.reply_text("📊 API вернул пустой ответ")
+        return None
+
+    if 'data' in stats_response:
+        return stats_response['data']
+    elif 'success' in stats_response and stats_response.get('data'):
+        return stats_response['data']
+    elif isinstance(stats_response, list):
+        return stats_response
 
+    logger.error(f"Unexpected API response structure: {stats_response}")
+    await message.reply_text("❌ Неожиданный формат ответа от API")
+    return None
+
+
+async def send_spending_chart(message):
+    try:
         # ✅ ИСПРАВЛЕНИЕ: Правильно получаем user_id в зависимости от типа message
         if hasattr(message, 'chat_id'):
             # Это callback_query.message
@@ -400,75 +496,39 @@ async def send_spending_chart(message):
 
         logger.info(f"📊 Getting spending chart for admin user_id: {user_id}")
 
-        # Получаем админа из БД
-        admin_user = await db_manager.get_user(user_id)
+        # Траты считаются локально по журналу LwCoinTransaction;
+        # сервер нужен, только если в журнале ещё ничего нет
+        daily_stats = await ledger_analytics.daily_spending(30)
+        features_data = await ledger_analytics.feature_usage(30)
 
-        if not admin_user:
-            logger.error(f"❌ Admin user {user_id} not found in DB")
-            await message.reply_text("❌ Админ не найден. Сначала свяжите аккаунт через email")
-            return
-
-        if not admin_user.api_token:
-            logger.error(f"❌ Admin user {user_id} has no API token")
-            await message.reply_text(
-                "❌ Аккаунт не привязан.\n"
-                "Используйте кнопку '🔗 Связать аккаунт' в главном меню"
-            )
-            return
-
-        logger.info(f"✅ Found admin with token, requesting data from server...")
-
-        try:
-            stats_response = await api_client._request(
-                'GET',
-                '/api/stats/coin-spending-daily?days=30',
-                headers={'Authorization': f'Bearer {admin_user.api_token}'}
-            )
-        except Exception as api_error:
-            logger.error(f"API request failed: {api_error}")
-            await message.reply_text(f"❌ Ошибка API: {str(api_error)}")
-            return
-
-        if not stats_response:
-            logger.warning("Empty response from API")
-            await message.reply_text("📊 API вернул пустой ответ")
-            return
-
-        if 'data' in stats_response:
-            daily_stats = stats_response['data']
-        elif 'success' in stats_response and stats_response.get('data'):
-            daily_stats = stats_response['data']
-        elif isinstance(stats_response, list):
-            daily_stats = stats_response
-        else:
-            logger.error(f"Unexpected API response structure: {stats_response}")
-            await message.reply_text("❌ Неожиданный формат ответа от API")
-            return
+        if not features_data:
+            daily_stats = await _fetch_server_spending(message, user_id)
+            if daily_stats is None:
+                return
 
         if not daily_stats:
             await message.reply_text("📊 Нет данных о тратах за последние 30 дней")
             return
 
-        logger.info(f"📊 Got {len(daily_stats)} days of data from server")
+        logger.info(f"📊 Got {len(daily_stats)} days of spending data")
 
         # Генерируем график
-        from bot.utils.charts import generate_spending_chart_from_server_data
-        chart_path = await generate_spending_chart_from_server_data(daily_stats)
-
-        with open(chart_path, 'rb') as photo:
-            # Считаем общую сумму трат
-            total_spent = sum(
-                stat.get('TotalSpent', stat.get('totalSpent', 0))
-                for stat in daily_stats
-            )
+        # Считаем общую сумму трат
+        daily_totals = [stat.get('TotalSpent', stat.get('totalSpent', 0)) for stat in daily_stats]
+        total_spent = sum(daily_totals)
+
+        await _reply_chart(
+            message,
+            generate_spending_chart_from_server_data,
+            daily_stats,
+            caption=f"📊 *График трат монет за 30 дней*\n\n"
+                    f"💸 *Всего потрачено:* `{total_spent}` монет\n"
+                    f"📅 *Дней с активностью:* `{sum(1 for total in daily_totals if total)}`",
+            parse_mode='MarkdownV2'
+        )
 
-            await message.reply_photo(
-                photo=photo,
-                caption=f"📊 *График трат монет за 30 дней*\n\n"
-                        f"💸 *Всего потрачено:* `{total_spent}` монет\n"
-                        f"📅 *Дней с активностью:* `{len(daily_stats)}`",
-                parse_mode='MarkdownV2'
-            )
+        if features_data:
+            await _reply_chart(message, generate_feature_usage_chart, features_data)
 
         # Отправляем отдельное сообщение с кнопкой
         keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data="admin")]]
@@ -478,9 +538,11 @@ async def send_spending_chart(message):
             parse_mode='MarkdownV2'
         )
 
-        os.remove(chart_path)
         logger.info("✅ Spending chart sent successfully")
 
+    except ChartQueueFullError:
+        logger.warning("Chart queue full, spending chart rejected")
+        await message.reply_text("⏳ Сейчас строится слишком много графиков, попробуйте через минуту")
     except Exception as e:
         logger.error(f"Error generating spending chart: {e}")
         logger.exception("Full traceback:")
@@ -502,7 +564,7 @@ async def send_revenue_chart(message):
 
         logger.info(f"📈 Getting revenue chart for admin user_id: {user_id}")
 
-        admin_user = await db_manager.get_user(user_id)
+        admin_user = await db_manager.get_user_record(user_id)
 
         if not admin_user:
             logger.error(f"❌ Admin user {user_id} not found in DB")
@@ -521,10 +583,9 @@ async def send_revenue_chart(message):
 
         # Запрос к бэкенду
         try:
-            revenue_response = await api_client._request(
-                'GET',
+            revenue_response = await api_client.get_analytics(
                 '/api/stats/revenue-daily?days=30',
-                headers={'Authorization': f'Bearer {admin_user.api_token}'}
+                admin_user.api_token
             )
         except Exception as api_error:
             logger.error(f"API request failed: {api_error}")
@@ -553,29 +614,28 @@ async def send_revenue_chart(message):
 
         logger.info(f"📈 Got {len(daily_revenue)} days of revenue data")
 
-        from bot.utils.charts import generate_revenue_chart_from_server_data
-        chart_path = await generate_revenue_chart_from_server_data(daily_revenue, [])
-
-        with open(chart_path, 'rb') as photo:
-            total_revenue = sum(
-                stat.get('TotalRevenue', stat.get('totalRevenue', 0))
-                for stat in daily_revenue
-            )
+        total_revenue = sum(
+            stat.get('TotalRevenue', stat.get('totalRevenue', 0))
+            for stat in daily_revenue
+        )
 
-            def escape_md(text):
-                special_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.',
-                                 '!']
-                for char in special_chars:
-                    text = str(text).replace(char, f'\\{char}')
-                return text
+        def escape_md(text):
+            special_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.',
+                             '!']
+            for char in special_chars:
+                text = str(text).replace(char, f'\\{char}')
+            return text
 
-            await message.reply_photo(
-                photo=photo,
-                caption=f"📈 *График доходов за 30 дней*\n\n"
-                        f"💰 *Всего:* `{escape_md(f'{total_revenue:.2f}')} €`\n"
-                        f"📅 *Дней с платежами:* `{len(daily_revenue)}`",
-                parse_mode='MarkdownV2'
-            )
+        await _reply_chart(
+            message,
+            generate_revenue_chart_from_server_data,
+            daily_revenue,
+            [],
+            caption=f"📈 *График доходов за 30 дней*\n\n"
+                    f"💰 *Всего:* `{escape_md(f'{total_revenue:.2f}')} €`\n"
+                    f"📅 *Дней с платежами:* `{len(daily_revenue)}`",
+            parse_mode='MarkdownV2'
+        )
 
         # Отправляем отдельное сообщение с кнопкой
         keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data="admin")]]
@@ -585,9 +645,11 @@ async def send_revenue_chart(message):
             parse_mode='MarkdownV2'
         )
 
-        os.remove(chart_path)
         logger.info("✅ Revenue chart sent successfully")
 
+    except ChartQueueFullError:
+        logger.warning("Chart queue full, revenue chart rejected")
+        await message.reply_text("⏳ Сейчас строится слишком много графиков, попробуйте через минуту")
     except Exception as e:
         logger.error(f"Error generating revenue chart: {e}")
         logger.exception("Full traceback:")
@@ -601,6 +663,7 @@ async def show_referral_links(message):
             select(ReferralLink)
             .where(ReferralLink.is_active == True)
             .order_by(ReferralLink.created_at.desc())
+            .limit(10)
         )
         links = result.scalars().all()
 
@@ -626,10 +689,11 @@ async def show_referral_links(message):
 
     for link in links[:10]:
         link_url = f"https://t.me/{bot_username}?start={link.code}"
+        pending_clicks, pending_registrations = referral_counters.pending(link.code)
         text += f"*{escape_md(link.name)}*\n"
         text += f"🔗 `{escape_md(link_url)}`\n"
-        text += f"👁 Переходов: `{link.clicks}`\n"
-        text += f"👤 Регистраций: `{link.registrations}`\n"
+        text += f"👁 Переходов: `{link.clicks + pending_clicks}`\n"
+        text += f"👤 Регистраций: `{link.registrations + pending_registrations}`\n"
         text += f"💰 Покупок: `{link.purchases}`\n"
         text += f"💵 Доход: `{escape_md(f'{link.total_revenue:.2f}')} €`\n\n"
 
@@ -647,7 +711,7 @@ async def show_user_stats(message):
     else:
         user_id = message.chat.id
 
-    admin_user = await db_manager.get_user(user_id)
+    admin_user = await db_manager.get_user_record(user_id)
 
     if not admin_user or not admin_user.api_token:
         keyboard = [
@@ -664,30 +728,17 @@ async def show_user_stats(message):
 
         logger.info(f"📊 Getting user stats from backend for admin {user_id}")
 
-        # 1. ✅ Используем /api/health/db-info
-        db_info = await api_client._request(
-            'GET',
-            '/api/health/db-info'
-        )
-
-        total_users = db_info.get('users', 0)
-        total_activities = db_info.get('activities', 0)
-        total_food_intakes = db_info.get('foodIntakes', 0)
-        total_steps_records = db_info.get('stepsRecords', 0)
-
-        revenue_stats = await api_client._request(
-            'GET',
-            '/api/stats/revenue-by-source?days=30',
-            headers={'Authorization': f'Bearer {admin_user.api_token}'}
-        )
-
-        tribute_count = revenue_stats.get('data', {}).get('tribute', {}).get('count', 0)
-        mobile_count = revenue_stats.get('data', {}).get('mobile', {}).get('count', 0)
-        total_active_subs = tribute_count + mobile_count
+        # ✅ /api/health/db-info и /api/stats/revenue-by-source запрашиваются параллельно
+        sources, errors = await fan_out({
+            'db_info': lambda: api_client.get_analytics('/api/health/db-info'),
+            'revenue_stats': lambda: api_client.get_analytics(
+                '/api/stats/revenue-by-source?days=30',
+                admin_user.api_token
+            )
+        }, timeout=config.ADMIN_STATS_TIMEOUT)
 
-        tribute_revenue = revenue_stats.get('data', {}).get('tribute', {}).get('revenue', 0)
-        mobile_revenue = revenue_stats.get('data', {}).get('mobile', {}).get('revenue', 0)
-        total_revenue = revenue_stats.get('data', {}).get('total', {}).get('revenue', 0)
+        if len(errors) == 2:
+            raise errors['db_info']
 
         def escape_md(text):
             special_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
@@ -696,20 +747,47 @@ async def show_user_stats(message):
             return text
 
         text = "👥 *Статистика пользователей*\n\n"
-        text += f"📱 *Всего пользователей:* `{total_users}`\n"
-        text += f"🔄 *Активных подписок \\(30 дней\\):* `{total_active_subs}`\n"
-        text += f"  • 💳 Tribute: `{tribute_count}`\n"
-        text += f"  • 📱 Mobile: `{mobile_count}`\n\n"
+
+        db_info = sources.get('db_info')
+        revenue_stats = sources.get('revenue_stats')
+
+        if revenue_stats is not None:
+            revenue_data = revenue_stats.get('data', {})
+            tribute_count = revenue_data.get('tribute', {}).get('count', 0)
+            mobile_count = revenue_data.get('mobile', {}).get('count', 0)
+            total_active_subs = tribute_count + mobile_count
+
+            tribute_revenue = revenue_data.get('tribute', {}).get('revenue', 0)
+            mobile_revenue = revenue_data.get('mobile', {}).get('revenue', 0)
+            total_revenue = revenue_data.get('total', {}).get('revenue', 0)
+
+        if db_info is not None:
+            text += f"📱 *Всего пользователей:* `{db_info.get('users', 0)}`\n"
+        else:
+            text += "📱 *Всего пользователей:* `—`\n"
+
+        if revenue_stats is not None:
+            text += f"🔄 *Активных подписок \\(30 дней\\):* `{total_active_subs}`\n"
+            text += f"  • 💳 Tribute: `{tribute_count}`\n"
+            text += f"  • 📱 Mobile: `{mobile_count}`\n\n"
+        else:
+            text += "🔄 *Активных подписок \\(30 дней\\):* `—`\n\n"
 
         text += f"*Активность пользователей:*\n"
-        text += f"🏋️ Тренировок: `{total_activities}`\n"
-        text += f"🍽 Приемов пищи: `{total_food_intakes}`\n"
-        text += f"👣 Записей шагов: `{total_steps_records}`\n\n"
+        if db_info is not None:
+            text += f"🏋️ Тренировок: `{db_info.get('activities', 0)}`\n"
+            text += f"🍽 Приемов пищи: `{db_info.get('foodIntakes', 0)}`\n"
+            text += f"👣 Записей шагов: `{db_info.get('stepsRecords', 0)}`\n\n"
+        else:
+            text += "⚠️ _Данные временно недоступны_\n\n"
 
         text += f"*Доходы \\(30 дней\\):*\n"
-        text += f"💰 Всего: `{escape_md(f'{total_revenue:.2f}')} €`\n"
-        text += f"  • Tribute: `{escape_md(f'{tribute_revenue:.2f}')} €`\n"
-        text += f"  • Mobile: `{escape_md(f'{mobile_revenue:.2f}')} €`\n"
+        if revenue_stats is not None:
+            text += f"💰 Всего: `{escape_md(f'{total_revenue:.2f}')} €`\n"
+            text += f"  • Tribute: `{escape_md(f'{tribute_revenue:.2f}')} €`\n"
+            text += f"  • Mobile: `{escape_md(f'{mobile_revenue:.2f}')} €`\n"
+        else:
+            text += "⚠️ _Данные временно недоступны_\n"
 
         keyboard = [
             [InlineKeyboardButton("🔙 Назад", callback_data="admin")],
@@ -764,6 +842,7 @@ async def admin_callback_button(update: Update, context: ContextTypes.DEFAULT_TY
         [InlineKeyboardButton("🔗 Создать реф. ссылку", callback_data="admin_create_referral")],
         [InlineKeyboardButton("📋 Список реф. ссылок", callback_data="admin_list_referrals")],
         [InlineKeyboardButton("👥 Статистика пользователей", callback_data="admin_user_stats")],
+        [InlineKeyboardButton("🔄 Обновить аналитику", callback_data="admin_refresh_analytics")],
         [InlineKeyboardButton("🔙 Назад", callback_data="start")]
     ]
 
@@ -24,7 +24,7 @@ async def show_subscriptions(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await query.answer()
 
     user = query.from_user
-    db_user = await db_manager.get_user(user.id)
+    db_user = await db_manager.get_user_record(user.id)
 
     if not db_user or not db_user.api_token:
         keyboard = [
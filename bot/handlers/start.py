@@ -1,15 +1,17 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, CommandHandler, CallbackQueryHandler, MessageHandler, filters
 from bot.database import db_manager, User
-from bot.api_client import api_client
+from bot.api_client import api_client, APIUnavailableError
 from bot.config import config
 from bot.utils.tracking import track_referral
+from bot.utils.ledger import ledger_writer
 import logging
 import re
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+BALANCE_LOADING_TEXT = "💰 *Ваш баланс:* загружается\\.\\.\\.\n"
+
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command"""
@@ -22,20 +24,21 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         referral_code = args[0]
 
     # Get or create user in bot database
-    db_user = await db_manager.get_user(user.id)
+    db_user = await db_manager.get_user_record(user.id)
 
-    if not db_user:
+    is_new_user = db_user is None
+
+    if is_new_user:
         # New user registration
         db_user = await db_manager.create_user(
             telegram_id=user.id,
             username=user.username,
             first_name=user.first_name,
             last_name=user.last_name,
-            registration_coins=config.DEFAULT_REGISTRATION_COINS,
-            referred_by=referral_code
+            registration_coins=config.DEFAULT_REGISTRATION_COINS
         )
 
-        # Track referral
+        # Track referral (also attributes the user to the link)
         if referral_code:
             await track_referral(referral_code, user.id)
 
@@ -51,23 +54,6 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         welcome_text = f"👋 *С возвращением, {user.first_name}\\!*\n\n"
 
-        # Update balance if user is linked
-        if db_user.api_token:
-            try:
-                balance = await api_client.get_balance(db_user.api_token)
-                welcome_text += f"💰 *Ваш баланс:* `{balance.get('balance', 0)}` монет\n"
-
-                if balance.get('hasActiveSubscription'):
-                    expiry = balance.get('subscriptionExpiresAt', '')
-                    if expiry and len(expiry) >= 10:
-                        expiry = expiry[:10]
-                        welcome_text += f"📅 *Подписка до:* `{expiry}`\n"
-            except Exception as e:
-                logger.error(f"Error getting balance: {e}")
-                welcome_text += "💰 *Ваш баланс:* загружается\\.\\.\\.\n"
-        else:
-            welcome_text += "💰 *Ваш баланс:* загружается\\.\\.\\.\n"
-
     # Main menu keyboard
     keyboard = [
         [InlineKeyboardButton("💰 Баланс", callback_data="balance"),
@@ -84,6 +70,48 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     reply_markup = InlineKeyboardMarkup(keyboard)
 
+    if is_new_user:
+        await update.message.reply_text(
+            welcome_text,
+            reply_markup=reply_markup,
+            parse_mode='MarkdownV2'
+        )
+        return
+
+    if not db_user.api_token:
+        await update.message.reply_text(
+            welcome_text + BALANCE_LOADING_TEXT,
+            reply_markup=reply_markup,
+            parse_mode='MarkdownV2'
+        )
+        return
+
+    if config.START_STALE_WHILE_REVALIDATE:
+        # Reply instantly with the last known balance, refresh in background
+        balance, is_fresh = api_client.peek_balance(user.id)
+        shown_text = welcome_text + (format_balance_text(balance) if balance else BALANCE_LOADING_TEXT)
+
+        message = await update.message.reply_text(
+            shown_text,
+            reply_markup=reply_markup,
+            parse_mode='MarkdownV2'
+        )
+
+        if not is_fresh:
+            context.application.create_task(
+                refresh_start_balance(message, db_user.api_token, user.id,
+                                      welcome_text, shown_text, reply_markup)
+            )
+        return
+
+    # Update balance if user is linked
+    try:
+        balance = await api_client.get_balance(db_user.api_token, telegram_id=user.id)
+        welcome_text += format_balance_text(balance)
+    except Exception as e:
+        logger.error(f"Error getting balance: {e}")
+        welcome_text += BALANCE_LOADING_TEXT
+
     await update.message.reply_text(
         welcome_text,
         reply_markup=reply_markup,
@@ -91,10 +119,46 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+def format_balance_text(balance: dict) -> str:
+    """Balance lines of the main menu greeting"""
+    text = f"💰 *Ваш баланс:* `{balance.get('balance', 0)}` монет\n"
+
+    if balance.get('hasActiveSubscription'):
+        expiry = balance.get('subscriptionExpiresAt', '')
+        if expiry and len(expiry) >= 10:
+            expiry = expiry[:10]
+            text += f"📅 *Подписка до:* `{expiry}`\n"
+
+    return text
+
+
+async def refresh_start_balance(message, token: str, telegram_id: int,
+                                welcome_text: str, shown_text: str, reply_markup):
+    """Fetch fresh balance and edit the greeting in place if it changed"""
+    try:
+        balance = await api_client.get_balance(token, telegram_id=telegram_id)
+    except Exception as e:
+        logger.warning(f"Background balance refresh failed for {telegram_id}: {e}")
+        return
+
+    fresh_text = welcome_text + format_balance_text(balance)
+    if fresh_text == shown_text:
+        return
+
+    try:
+        await message.edit_text(
+            fresh_text,
+            reply_markup=reply_markup,
+            parse_mode='MarkdownV2'
+        )
+    except Exception as e:
+        logger.warning(f"Could not update greeting for {telegram_id}: {e}")
+
+
 async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /balance command"""
     user = update.effective_user
-    db_user = await db_manager.get_user(user.id)
+    db_user = await db_manager.get_user_record(user.id)
 
     if not db_user or not db_user.api_token:
         keyboard = [[InlineKeyboardButton("🔗 Связать аккаунт", callback_data="link_account")]]
@@ -105,7 +169,7 @@ async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     try:
-        balance = await api_client.get_balance(db_user.api_token)
+        balance = await api_client.get_balance(db_user.api_token, telegram_id=user.id)
 
         text = f"""💰 *Ваш баланс*
 
@@ -128,6 +192,9 @@ async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             parse_mode='MarkdownV2'
         )
 
+    except APIUnavailableError as e:
+        logger.warning(f"Balance unavailable: {e}")
+        await update.message.reply_text("⏳ Сервис временно недоступен. Попробуйте через минуту.")
     except Exception as e:
         logger.error(f"Error getting balance: {e}")
         await update.message.reply_text("❌ Ошибка получения баланса. Попробуйте позже.")
@@ -136,7 +203,7 @@ async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /subscribe command - показывает меню подписок"""
     user = update.effective_user
-    db_user = await db_manager.get_user(user.id)
+    db_user = await db_manager.get_user_record(user.id)
 
     if not db_user:
         await update.message.reply_text("❌ Используйте /start для начала работы")
@@ -218,23 +285,18 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def track_coin_usage(telegram_id: int, amount: int, feature: str, description: str = None):
     """Записать использование монет для статистики"""
     try:
-        from bot.database import LwCoinTransaction
-        async with db_manager.SessionLocal() as session:
-            db_user = await db_manager.get_user(telegram_id)
-
-            spending = LwCoinTransaction(
-                telegram_id=telegram_id,
-                api_user_id=db_user.api_user_id if db_user else None,
-                amount=amount,
-                type='spent',
-                feature_used=feature,
-                description=description,
-                date=datetime.utcnow().strftime('%Y-%m-%d')
-            )
-            session.add(spending)
-            await session.commit()
-
-            logger.info(f"Tracked coin usage: {telegram_id} spent {amount} coins on {feature}")
+        db_user = await db_manager.get_user_record(telegram_id)
+
+        await ledger_writer.write({
+            'telegram_id': telegram_id,
+            'api_user_id': db_user.api_user_id if db_user else None,
+            'amount': amount,
+            'type': 'spent',
+            'feature_used': feature,
+            'description': description,
+        })
+
+        logger.info(f"Tracked coin usage: {telegram_id} spent {amount} coins on {feature}")
     except Exception as e:
         logger.error(f"Error tracking coin usage: {e}")
 
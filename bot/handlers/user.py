@@ -2,7 +2,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, CallbackQueryHandler, ConversationHandler, MessageHandler, filters, \
     CommandHandler
 from bot.database import db_manager
-from bot.api_client import api_client
+from bot.api_client import api_client, APIUnavailableError
 from bot.config import config
 import logging
 
@@ -18,7 +18,7 @@ async def show_balance(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
 
     user = query.from_user
-    db_user = await db_manager.get_user(user.id)
+    db_user = await db_manager.get_user_record(user.id)
 
     if not db_user or not db_user.api_token:
         keyboard = [[InlineKeyboardButton("🔗 Связать аккаунт", callback_data="link_account")]]
@@ -29,7 +29,7 @@ async def show_balance(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     try:
-        balance = await api_client.get_balance(db_user.api_token)
+        balance = await api_client.get_balance(db_user.api_token, telegram_id=user.id)
 
         text = f"""💰 *Ваш баланс*
 
@@ -52,6 +52,13 @@ async def show_balance(update: Update, context: ContextTypes.DEFAULT_TYPE):
             parse_mode='MarkdownV2'
         )
 
+    except APIUnavailableError as e:
+        logger.warning(f"Balance unavailable: {e}")
+        await query.message.edit_text(
+            "⏳ Сервис временно недоступен. Попробуйте через минуту.",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Назад", callback_data="start")]])
+        )
+
     except Exception as e:
         logger.error(f"Error getting balance: {e}")
         await query.message.edit_text(
@@ -236,11 +243,14 @@ async def handle_code_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 session.add(db_user)
                 await session.commit()
 
+            db_manager.invalidate_user(user.id)
+            api_client.invalidate_balance(user.id)
+
             keyboard = [[InlineKeyboardButton("🏠 В меню", callback_data="start")]]
             reply_markup = InlineKeyboardMarkup(keyboard)
 
             try:
-                balance = await api_client.get_balance(result['accessToken'])
+                balance = await api_client.get_balance(result['accessToken'], telegram_id=user.id)
                 balance_text = f"\n💰 *Ваш баланс:* `{balance.get('balance', 0)}` монет"
 
                 if balance.get('hasActiveSubscription'):
@@ -375,13 +385,13 @@ async def back_to_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data.clear()
 
     user = query.from_user
-    db_user = await db_manager.get_user(user.id)
+    db_user = await db_manager.get_user_record(user.id)
 
     welcome_text = f"👋 *С возвращением, {user.first_name}\\!*\n\n"
 
     if db_user and db_user.api_token:
         try:
-            balance = await api_client.get_balance(db_user.api_token)
+            balance = await api_client.get_balance(db_user.api_token, telegram_id=user.id)
             welcome_text += f"💰 *Ваш баланс:* `{balance.get('balance', 0)}` монет\n"
 
             if balance.get('hasActiveSubscription'):
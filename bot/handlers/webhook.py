@@ -1,12 +1,77 @@
 from bot.database import db_manager, Payment, LwCoinTransaction
 from bot.api_client import api_client
+from bot.config import config
+from bot.utils.cache import TTLCache
+from bot.utils.ledger import ledger_writer
 from datetime import datetime
+from sqlalchemy import select
+from typing import Dict
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Recently completed Tribute transaction_ids (durable check: unique Payment.payment_id)
+processed_transactions = TTLCache(config.TRIBUTE_PROCESSED_CACHE_SIZE, config.TRIBUTE_PROCESSED_CACHE_TTL)
+_inflight_transactions: Dict[str, asyncio.Future] = {}
+
+
+async def is_transaction_processed(transaction_id: str) -> bool:
+    """Completed payment with this transaction_id exists (memory, then unique index)"""
+    if transaction_id in processed_transactions:
+        return True
+
+    async with db_manager.SessionLocal() as session:
+        result = await session.execute(
+            select(Payment.id)
+            .where(Payment.payment_id == transaction_id)
+            .where(Payment.status == 'completed')
+        )
+        processed = result.first() is not None
+
+    if processed:
+        processed_transactions.set(transaction_id, True)
+    return processed
+
 
 async def handle_tribute_payment(payment_data: dict):
+    """Process a Tribute payment once per transaction_id
+
+    Retried webhooks are acknowledged (True) without a backend call or a
+    database write; concurrent deliveries of the same transaction share
+    one processing run.
+    """
+    transaction_id = payment_data.get('transaction_id')
+    if not transaction_id:
+        return await _process_tribute_payment(payment_data)
+
+    if transaction_id in processed_transactions:
+        logger.info(f"🔁 Duplicate Tribute payment ignored: {transaction_id}")
+        return True
+
+    inflight = _inflight_transactions.get(transaction_id)
+    if inflight is not None:
+        logger.info(f"🔁 Tribute payment {transaction_id} is already being processed")
+        return await asyncio.shield(inflight)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight_transactions[transaction_id] = future
+    try:
+        if await is_transaction_processed(transaction_id):
+            logger.info(f"🔁 Duplicate Tribute payment ignored: {transaction_id}")
+            result = True
+        else:
+            result = await _process_tribute_payment(payment_data)
+        future.set_result(result)
+        return result
+    except BaseException:
+        future.set_result(False)
+        raise
+    finally:
+        _inflight_transactions.pop(transaction_id, None)
+
+
+async def _process_tribute_payment(payment_data: dict):
     try:
         user_id = payment_data.get('user_id')
         package_id = payment_data.get('package_id')
@@ -15,7 +80,7 @@ async def handle_tribute_payment(payment_data: dict):
 
         logger.info(f"💳 Processing Tribute payment: user={user_id}, package={package_id}, amount={amount}")
 
-        db_user = await db_manager.get_user(user_id)
+        db_user = await db_manager.get_user_record(user_id)
         if not db_user:
             logger.error(f"❌ User {user_id} not found in database")
             return False
@@ -35,13 +100,13 @@ async def handle_tribute_payment(payment_data: dict):
             db_user.api_token,
             coins=package['coins'],
             days=package['days'],
-            price=package['price']
+            price=package['price'],
+            telegram_id=user_id
         )
 
         logger.info(f"✅ Coins credited: {package['coins']} to user {user_id}")
 
         async with db_manager.SessionLocal() as session:
-            from sqlalchemy import select
             stmt = select(Payment).where(
                 Payment.telegram_id == user_id,
                 Payment.package_id == package_id,
@@ -81,8 +146,19 @@ async def handle_tribute_payment(payment_data: dict):
             )
             session.add(coin_transaction)
 
+            await db_manager.bump_daily_stats(
+                session,
+                payment.completed_at.strftime('%Y-%m-%d'),
+                payments=1,
+                revenue=payment.amount or 0,
+                coin_transactions=1,
+                coins_credited=package['coins']
+            )
+
             await session.commit()
 
+        if transaction_id:
+            processed_transactions.set(transaction_id, True)
         logger.info(f"💾 Payment saved to database: {transaction_id}")
         return True
 
@@ -93,27 +169,19 @@ async def handle_tribute_payment(payment_data: dict):
 
 async def track_coin_spending(user_id: int, amount: int, feature: str, description: str = None):
     try:
-        db_user = await db_manager.get_user(user_id)
+        db_user = await db_manager.get_user_record(user_id)
         if not db_user:
             logger.warning(f"User {user_id} not found for coin spending tracking")
             return
 
-        async with db_manager.SessionLocal() as session:
-            spending = LwCoinTransaction(
-                telegram_id=user_id,
-                api_user_id=db_user.api_user_id,
-                amount=-abs(amount),
-                type='spent',
-                feature_used=feature,
-                description=description or f"Использована функция {feature}",
-                date=datetime.utcnow().strftime('%Y-%m-%d')
-            )
-            session.add(spending)
-
-            db_user.total_spent = (db_user.total_spent or 0) + abs(amount)
-            session.add(db_user)
-
-            await session.commit()
+        await ledger_writer.write({
+            'telegram_id': user_id,
+            'api_user_id': db_user.api_user_id,
+            'amount': -abs(amount),
+            'type': 'spent',
+            'feature_used': feature,
+            'description': description or f"Использована функция {feature}",
+        }, spent=abs(amount))
 
         logger.info(f"💸 Tracked spending: user={user_id}, amount={amount}, feature={feature}")
 
@@ -2,10 +2,18 @@
 import logging
 import asyncio
 from telegram import Update
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters
-from bot.config import config
+from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, TypeHandler, filters
+from bot.config import config, log_environment
 from bot.database import db_manager
+from bot.api_client import api_client
 from bot.handlers import start, admin, payment, user
+from bot.utils.deadline import start_update_deadline
+from bot.utils.activity import activity_tracker, track_activity
+from bot.utils.ledger import ledger_writer
+from bot.utils.tracking import referral_counters
+from bot.utils.rollups import ensure_backfilled
+from bot.utils.analytics import ledger_analytics
+from bot.utils.chart_service import chart_service
 import sys
 
 
@@ -27,6 +35,27 @@ async def post_init(application: Application):
     await db_manager.init_db()
     logger.info("Database initialized")
 
+    # Build daily_stats rollups from history on first start after upgrade
+    await ensure_backfilled()
+
+    # Open pooled API session
+    await api_client.start()
+
+    # Batched last_active writes
+    activity_tracker.start()
+
+    # Group-commit coin ledger writes
+    ledger_writer.start()
+
+    # Buffered referral link counters
+    referral_counters.start()
+
+    # Load the spending ledger for local charts without delaying startup
+    ledger_analytics.preload()
+
+    # Pre-warmed chart rendering workers
+    chart_service.start()
+
     # Set bot commands
     await application.bot.set_my_commands([
         ("start", "Главное меню"),
@@ -38,10 +67,27 @@ async def post_init(application: Application):
 
     logger.info("✅ Bot initialized successfully - NO product initialization needed")
 
-def main():
-    """Start the bot"""
-    # Create application
-    application = Application.builder().token(config.BOT_TOKEN).post_init(post_init).build()
+async def post_shutdown(application: Application):
+    """Release resources on shutdown"""
+    logger.info(f"Balance cache stats: {api_client.balance_cache.stats()}, "
+                f"coalesced requests: {api_client.coalesced_requests}")
+    await ledger_writer.stop()
+    logger.info(f"Ledger rows written: {ledger_writer.rows_written} in {ledger_writer.batches_written} batches")
+    logger.info(f"Chart cache stats: {chart_service.cache.stats()}, rendered: {chart_service.rendered}, "
+                f"coalesced: {chart_service.coalesced}")
+    await chart_service.stop()
+    await referral_counters.stop()
+    await activity_tracker.stop()
+    await api_client.close()
+    logger.info("Bot shutdown complete")
+
+def register_handlers(application: Application):
+    """Register all update handlers and the error handler"""
+    # Record user activity in memory (flushed in batches)
+    application.add_handler(TypeHandler(Update, track_activity), group=-2)
+
+    # Shared backend time budget for each update
+    application.add_handler(TypeHandler(Update, start_update_deadline), group=-1)
 
     # Register handlers
     start.register_start_handlers(application)
@@ -59,6 +105,33 @@ def main():
 
     application.add_error_handler(error_handler)
 
+
+def build_application(bot=None) -> Application:
+    """Create the application with all handlers (bot can be replaced in benchmarks)"""
+    builder = Application.builder()
+    if bot is not None:
+        builder = builder.bot(bot)
+    else:
+        builder = builder.token(config.BOT_TOKEN)
+
+    application = (
+        builder
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+
+    register_handlers(application)
+    return application
+
+
+def main():
+    """Start the bot"""
+    log_environment()
+
+    # Create application
+    application = build_application()
+
     # Start bot
     logger.info("🚀 Starting bot...")
     logger.info("💳 Tribute integration: DIRECT LINK MODE")
@@ -0,0 +1,67 @@
+import logging
+from datetime import datetime
+from typing import Dict
+from sqlalchemy import bindparam
+from bot.config import config
+from bot.database import db_manager, User
+from bot.utils.flusher import PeriodicFlusher
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTracker(PeriodicFlusher):
+    """Write-behind tracker for User.last_active
+
+    Touches are kept in memory (latest timestamp per user) and written as
+    one batched UPDATE every ACTIVITY_FLUSH_INTERVAL seconds, as soon as
+    ACTIVITY_FLUSH_BATCH users are pending, and on shutdown.
+    """
+
+    def __init__(self):
+        super().__init__('user activity', config.ACTIVITY_FLUSH_INTERVAL)
+        self._pending: Dict[int, datetime] = {}
+        self.flushed_rows = 0
+
+    def touch(self, telegram_id: int):
+        """Record activity; never touches the database"""
+        self._pending[telegram_id] = datetime.utcnow()
+        if len(self._pending) >= config.ACTIVITY_FLUSH_BATCH:
+            self.wake()
+
+    async def flush(self):
+        """Write pending touches in a single transaction"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            batch, self._pending = self._pending, {}
+            table = User.__table__
+            stmt = (
+                table.update()
+                .where(table.c.telegram_id == bindparam('b_telegram_id'))
+                .values(last_active=bindparam('b_last_active'))
+            )
+
+            try:
+                async with db_manager.engine.begin() as conn:
+                    await conn.execute(stmt, [
+                        {'b_telegram_id': telegram_id, 'b_last_active': last_active}
+                        for telegram_id, last_active in batch.items()
+                    ])
+            except Exception:
+                # Put the batch back unless newer touches arrived meanwhile
+                for telegram_id, last_active in batch.items():
+                    self._pending.setdefault(telegram_id, last_active)
+                raise
+
+            self.flushed_rows += len(batch)
+            logger.debug(f"Flushed last_active for {len(batch)} users")
+
+
+activity_tracker = ActivityTracker()
+
+
+async def track_activity(update, context):
+    """TypeHandler callback: remember that the update's user is active"""
+    if update.effective_user:
+        activity_tracker.touch(update.effective_user.id)
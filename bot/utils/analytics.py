@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import func, select
+from bot.database import db_manager, LwCoinTransaction
+
+logger = logging.getLogger(__name__)
+
+FETCH_PARTITION = 50000
+
+
+class LedgerAnalytics:
+    """Columnar in-memory copy of the spending ledger aggregated with NumPy
+
+    'spent' LwCoinTransaction rows are kept as three parallel arrays (day
+    number, feature code, coins). refresh() only pulls rows with an id above
+    the last one seen, so after the first load a query costs one small
+    SELECT plus a bincount over the arrays.
+    """
+
+    def __init__(self):
+        self._days = np.empty(0, dtype=np.int32)  # days since 1970-01-01
+        self._features = np.empty(0, dtype=np.int32)  # index into _feature_names
+        self._coins = np.empty(0, dtype=np.int64)
+        self._feature_names: List[str] = []
+        self._feature_index: Dict[str, int] = {}
+        self._last_id = 0
+        self._lock = asyncio.Lock()
+        self._preload: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._coins)
+
+    def _feature_code(self, name) -> int:
+        name = name or 'unknown'
+        code = self._feature_index.get(name)
+        if code is None:
+            code = self._feature_index[name] = len(self._feature_names)
+            self._feature_names.append(name)
+        return code
+
+    def preload(self):
+        """Load the ledger in the background (called from post_init)"""
+        async def load():
+            try:
+                await self.refresh()
+                logger.info(f"Ledger analytics loaded: {len(self)} rows")
+            except Exception as e:
+                logger.error(f"Error loading ledger analytics: {e}")
+
+        self._preload = asyncio.create_task(load())
+
+    async def refresh(self):
+        """Append ledger rows written since the last refresh"""
+        async with self._lock:
+            day = func.coalesce(LwCoinTransaction.date, func.date(LwCoinTransaction.created_at))
+            stmt = (
+                select(LwCoinTransaction.id, day, LwCoinTransaction.feature_used, LwCoinTransaction.amount)
+                .where(LwCoinTransaction.type == 'spent')
+                .where(LwCoinTransaction.id > self._last_id)
+                .order_by(LwCoinTransaction.id)
+            )
+
+            # Committed together with the arrays, so a failed stream is re-read next time
+            days, features, coins = [self._days], [self._features], [self._coins]
+            last_id = self._last_id
+            async with db_manager.engine.connect() as conn:
+                result = await conn.stream(stmt)
+                async for rows in result.partitions(FETCH_PARTITION):
+                    ids, dates, names, amounts = zip(*rows)
+                    days.append(np.array(dates, dtype='datetime64[D]').astype(np.int32))
+                    features.append(np.fromiter((self._feature_code(name) for name in names),
+                                                dtype=np.int32, count=len(names)))
+                    coins.append(np.abs(np.array(amounts, dtype=np.int64)))
+                    last_id = ids[-1]
+
+            if len(coins) > 1:
+                self._days = np.concatenate(days)
+                self._features = np.concatenate(features)
+                self._coins = np.concatenate(coins)
+                self._last_id = last_id
+
+    async def aggregate(self, days: int) -> Tuple[List[str], List[str], np.ndarray, np.ndarray]:
+        """Per-day, per-feature totals for the last `days` days (UTC, today included)
+
+        Returns (dates, features, coins, counts); coins and counts are
+        days x features matrices.
+        """
+        await self.refresh()
+
+        today = np.datetime64(datetime.utcnow().date(), 'D').astype(np.int32)
+        first = today - days + 1
+        n_features = max(len(self._feature_names), 1)
+
+        mask = (self._days >= first) & (self._days <= today)
+        cells = (self._days[mask] - first).astype(np.int64) * n_features + self._features[mask]
+        size = days * n_features
+        coins = np.bincount(cells, weights=self._coins[mask], minlength=size).reshape(days, n_features)
+        counts = np.bincount(cells, minlength=size).reshape(days, n_features)
+
+        start = datetime.utcnow().date() - timedelta(days=days - 1)
+        dates = [(start + timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(days)]
+        return dates, list(self._feature_names) or ['unknown'], coins, counts
+
+    async def daily_spending(self, days: int = 30) -> List[Dict]:
+        """Rows shaped like /api/stats/coin-spending-daily data"""
+        dates, _, coins, _ = await self.aggregate(days)
+        return [{'Date': date, 'TotalSpent': int(total)} for date, total in zip(dates, coins.sum(axis=1))]
+
+    async def feature_usage(self, days: int = 30) -> List[Dict]:
+        """Per-feature usage for generate_feature_usage_chart, most coins first"""
+        _, features, coins, counts = await self.aggregate(days)
+        coins, counts = coins.sum(axis=0), counts.sum(axis=0)
+        order = np.argsort(-coins, kind='stable')
+        return [
+            {'Feature': features[i], 'UsageCount': int(counts[i]), 'TotalCoins': int(coins[i])}
+            for i in order if counts[i]
+        ]
+
+
+ledger_analytics = LedgerAnalytics()
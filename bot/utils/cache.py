@@ -0,0 +1,150 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, NamedTuple, Optional
+
+
+class TTLCache:
+    """Size-bounded in-process cache with per-entry TTL and LRU eviction"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return cached value or default; counts a hit or a miss"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store value, evicting the least recently used entries when full"""
+        if self.maxsize <= 0:
+            return
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        """Drop a single entry"""
+        self._data.pop(key, None)
+
+    def clear(self):
+        """Drop all entries"""
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for TTL tuning"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+class ChartEntry(NamedTuple):
+    png: bytes
+    file_id: Optional[str]
+
+
+class ChartCache:
+    """Content-addressed LRU cache of rendered charts
+
+    Entries hold the PNG bytes and, once sent, the Telegram file_id, and
+    are bounded by count and by total PNG bytes.
+    """
+
+    def __init__(self, maxsize: int, max_bytes: int):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, ChartEntry]" = OrderedDict()
+        self._bytes = 0
+
+    @staticmethod
+    def key(chart_type: str, *args: Any) -> str:
+        """Hash of the chart type and its input, independent of dict key order"""
+        payload = json.dumps([chart_type, args], sort_keys=True, default=str, separators=(',', ':'))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[ChartEntry]:
+        """Return the entry or None; counts a hit or a miss"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, key: str, png: bytes, file_id: Optional[str] = None):
+        """Store a chart, evicting least recently used entries over either limit"""
+        if self.maxsize <= 0 or len(png) > self.max_bytes:
+            return
+
+        self.invalidate(key)
+        self._data[key] = ChartEntry(png, file_id)
+        self._bytes += len(png)
+
+        while len(self._data) > self.maxsize or self._bytes > self.max_bytes:
+            _, evicted = self._data.popitem(last=False)
+            self._bytes -= len(evicted.png)
+
+    def invalidate(self, key: str):
+        """Drop a single entry"""
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.png)
+
+    def clear(self):
+        """Drop all entries"""
+        self._data.clear()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and memory use"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Awaitable, Callable, Dict, Optional
+from bot.config import config
+from bot.utils.cache import ChartCache
+
+logger = logging.getLogger(__name__)
+
+
+class ChartRenderError(Exception):
+    """Chart could not be rendered by the render service"""
+
+
+class ChartQueueFullError(ChartRenderError):
+    """Too many renders already queued"""
+
+
+class ChartTimeoutError(ChartRenderError):
+    """Render did not finish within CHART_RENDER_TIMEOUT"""
+
+
+def _warm_worker():
+    """Process initializer: import plotting and fill the font cache once"""
+    import io
+    import matplotlib
+    matplotlib.use('Agg')
+    import bot.utils.charts  # noqa: F401  (applies style and palette)
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(2, 1))
+    ax.plot([0, 1], [0, 1])
+    ax.set_title('warm-up')
+    fig.savefig(io.BytesIO(), format='png')
+    plt.close(fig)
+
+
+def _ping():
+    return True
+
+
+def _render(name: str, *args):
+    """Worker side: look up a render function in bot.utils.charts by name and run it"""
+    from bot.utils import charts
+    return getattr(charts, name)(*args)
+
+
+class ChartRenderService:
+    """Renders matplotlib charts in a pool of pre-warmed worker processes
+
+    render() never runs matplotlib on the event loop, and render functions
+    are passed by name so the bot process never imports bot.utils.charts. At most
+    CHART_MAX_QUEUE renders may be queued or running; beyond that it fails
+    fast with ChartQueueFullError. A render that exceeds
+    CHART_RENDER_TIMEOUT raises ChartTimeoutError (a job that already
+    started keeps its worker until it finishes and still counts against
+    the queue).
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._fallback: Optional[ThreadPoolExecutor] = None
+        self._warmup: Optional[asyncio.Task] = None
+        self._pending = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.cache = ChartCache(config.CHART_CACHE_SIZE, config.CHART_CACHE_MAX_BYTES)
+        self.rendered = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.coalesced = 0
+        self.restarts = 0
+
+    def start(self):
+        """Start the worker pool and warm every worker in the background (called from post_init)
+
+        Plotting is never imported in the bot process; workers load
+        matplotlib, the chart style and the font cache after the bot is
+        already polling.
+        """
+        if self._executor is not None:
+            return
+
+        self._executor = self._new_pool()
+        self._warmup = asyncio.create_task(self._warm())
+
+    @staticmethod
+    def _new_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=config.CHART_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_warm_worker
+        )
+
+    def _replace_broken(self, executor: ProcessPoolExecutor):
+        """Swap a pool whose worker died for a fresh, re-warmed one
+
+        A broken ProcessPoolExecutor fails every later submit, so without
+        this one crashed render (OOM, segfault) disables charts until restart.
+        """
+        if self._executor is not executor:
+            return  # another caller already replaced it
+
+        logger.error("Chart worker died, restarting the render pool")
+        self.restarts += 1
+        if self._warmup is not None and not self._warmup.done():
+            self._warmup.cancel()
+        self._executor = self._new_pool()
+        self._warmup = asyncio.create_task(self._warm())
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _warm(self):
+        executor = self._executor
+
+        def spawn_and_wait():
+            # One concurrent job per worker makes the pool spawn all of them;
+            # submitted from a thread so process start-up never blocks the loop
+            for future in [executor.submit(_ping) for _ in range(config.CHART_WORKERS)]:
+                future.result()
+
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(spawn_and_wait)
+            logger.info(f"Chart workers ready: {config.CHART_WORKERS} in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            logger.error(f"Error warming chart workers: {e}")
+
+    async def stop(self):
+        """Shut the pool down, dropping queued renders"""
+        if self._executor is None:
+            return
+
+        if self._warmup is not None and not self._warmup.done():
+            self._warmup.cancel()
+        executor, self._executor = self._executor, None
+        await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    def _release(self):
+        self._pending -= 1
+
+    async def shared(self, key: str, factory: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Run factory() once for concurrent callers with the same chart cache key
+
+        Admins get identical analytics input, so they miss the cache
+        together; without this each would queue its own render.
+        """
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        task = asyncio.ensure_future(factory())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish_inflight(key, done))
+        return await asyncio.shield(task)
+
+    def _finish_inflight(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark exception as retrieved when every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def render(self, name: str, *args):
+        """Run bot.utils.charts.<name>(*args) off the event loop and return its result
+
+        Without a started pool (scripts, benchmarks) renders run one at a
+        time in a helper thread, since pyplot state is not thread-safe.
+        """
+        loop = asyncio.get_running_loop()
+
+        if self._executor is None:
+            if self._fallback is None:
+                self._fallback = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chart-render')
+            return await loop.run_in_executor(self._fallback, _render, name, *args)
+
+        if self._pending >= config.CHART_MAX_QUEUE:
+            self.rejected += 1
+            raise ChartQueueFullError(f"{self._pending} charts already queued")
+
+        self._pending += 1
+        executor = self._executor
+        try:
+            future = executor.submit(_render, name, *args)
+        except BrokenProcessPool:
+            self._release()
+            self._replace_broken(executor)
+            raise ChartRenderError("Chart worker crashed, render pool restarted")
+        except Exception:
+            self._release()
+            raise
+        # Freed when the job really ends, not when the caller gives up
+        future.add_done_callback(lambda done: loop.call_soon_threadsafe(self._release))
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=config.CHART_RENDER_TIMEOUT)
+        except asyncio.TimeoutError:
+            future.cancel()
+            self.timed_out += 1
+            raise ChartTimeoutError(f"Chart render exceeded {config.CHART_RENDER_TIMEOUT}s")
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+            raise ChartRenderError("Chart worker crashed, render pool restarted")
+
+        self.rendered += 1
+        return result
+
+
+chart_service = ChartRenderService()
@@ -1,15 +1,52 @@
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from datetime import datetime, timedelta
 import seaborn as sns
-import tempfile
+import io
+import numpy as np
 from typing import List, Dict, Any
+from bot.utils.downsample import lttb, minmax_buckets, bucket_envelope
 
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
 
+# Upper bound on points drawn per series (CHART_MAX_POINTS in the bot)
+MAX_POINTS = 300
 
-async def generate_spending_chart_from_server_data(daily_stats: List[Dict]) -> str:
+
+def _png_bytes() -> bytes:
+    """Save the current figure as PNG in memory and close it"""
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+    plt.close()
+    return buffer.getvalue()
+
+
+def _parse_moment(value) -> datetime:
+    """'YYYY-MM-DD' or ISO datetime (hourly series) -> datetime"""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+
+
+def _date_format(dates) -> str:
+    """Tick label format for the covered range and resolution"""
+    span = dates[-1] - dates[0]
+    if span <= timedelta(days=3) and any(d.hour or d.minute for d in dates[:48]):
+        return '%d.%m %H:%M'
+    if span > timedelta(days=366):
+        return '%d.%m.%y'
+    return '%d.%m'
+
+
+def _label_positions(count: int, labels: int = 10) -> np.ndarray:
+    """About `labels` evenly spaced indices out of `count`"""
+    return np.unique(np.linspace(0, count - 1, min(count, labels)).astype(int))
+
+
+def _render_spending_chart(daily_stats: List[Dict], max_points: int = MAX_POINTS) -> bytes:
     fig, ax = plt.subplots(figsize=(12, 6))
 
     dates = []
@@ -19,7 +56,7 @@ async def generate_spending_chart_from_server_data(daily_stats: List[Dict]) -> s
         date_str = stat.get('Date', stat.get('date', ''))
         if date_str:
             try:
-                date = datetime.strptime(date_str, '%Y-%m-%d')
+                date = _parse_moment(date_str)
                 dates.append(date)
                 amounts.append(stat.get('TotalSpent', stat.get('totalSpent', 0)))
             except:
@@ -30,52 +67,65 @@ async def generate_spending_chart_from_server_data(daily_stats: List[Dict]) -> s
 
     sorted_data = sorted(zip(dates, amounts), key=lambda x: x[0])
     dates, amounts = zip(*sorted_data)
-
-    ax.plot(dates, amounts, marker='o', linewidth=2, markersize=8, color='#FF6B6B')
-    ax.fill_between(dates, amounts, alpha=0.3, color='#FF6B6B')
+    amounts = np.asarray(amounts, dtype=float)
+
+    # A noisy line is what makes the PNG grow, so dense series switch to a
+    # coarser envelope well before max_points
+    envelope_buckets = max(max_points // 5, 1)
+    if len(amounts) <= 2 * envelope_buckets:
+        plot_dates = list(dates)
+        plot_amounts = amounts
+        few_points = len(amounts) <= 60
+        ax.plot(plot_dates, plot_amounts, marker='o' if few_points else None,
+                linewidth=2 if few_points else 1.5, markersize=8, color='#FF6B6B')
+        ax.fill_between(plot_dates, plot_amounts, alpha=0.3, color='#FF6B6B')
+    else:
+        # Dense ranges: bucket means as the line, min/max band as the area
+        centers, lows, highs, plot_amounts = bucket_envelope(amounts, envelope_buckets)
+        plot_dates = [dates[i] for i in centers]
+        ax.plot(plot_dates, plot_amounts, linewidth=1.5, color='#FF6B6B')
+        ax.fill_between(plot_dates, lows, highs, alpha=0.3, color='#FF6B6B', linewidth=0)
 
     ax.set_xlabel('Дата', fontsize=12)
     ax.set_ylabel('Потрачено монет', fontsize=12)
     ax.set_title('График трат монет', fontsize=14, fontweight='bold')
 
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m'))
-    if len(dates) > 15:
-        ax.xaxis.set_major_locator(mdates.DayLocator(interval=5))
+    if len(dates) <= 31 and dates[-1] - dates[0] <= timedelta(days=31):
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m'))
+        if len(dates) > 15:
+            ax.xaxis.set_major_locator(mdates.DayLocator(interval=5))
+        else:
+            ax.xaxis.set_major_locator(mdates.DayLocator(interval=2))
     else:
-        ax.xaxis.set_major_locator(mdates.DayLocator(interval=2))
+        ax.xaxis.set_major_locator(mdates.AutoDateLocator(maxticks=12))
+        ax.xaxis.set_major_formatter(mdates.DateFormatter(_date_format(dates)))
     plt.xticks(rotation=45)
 
     ax.grid(True, alpha=0.3)
 
-    if amounts:
-        avg = sum(amounts) / len(amounts)
+    if len(amounts):
+        avg = amounts.mean()
         ax.axhline(y=avg, color='r', linestyle='--', alpha=0.7,
                    label=f'Среднее: {avg:.1f} монет')
         ax.legend()
 
-    # Добавляем значения на точках для лучшей читаемости
-    for i, (date, amount) in enumerate(zip(dates, amounts)):
-        if i % max(1, len(dates) // 10) == 0:  # Показываем каждое N-ое значение
-            ax.annotate(f'{amount:.0f}',
-                        xy=(date, amount),
-                        xytext=(0, 5),
-                        textcoords='offset points',
-                        ha='center',
-                        fontsize=8,
-                        alpha=0.7)
+    # Добавляем значения на точках для лучшей читаемости (~10 подписей)
+    for i in _label_positions(len(plot_dates)):
+        ax.annotate(f'{plot_amounts[i]:.0f}',
+                    xy=(plot_dates[i], plot_amounts[i]),
+                    xytext=(0, 5),
+                    textcoords='offset points',
+                    ha='center',
+                    fontsize=8,
+                    alpha=0.7)
 
     plt.tight_layout()
 
-    # Сохраняем в временный файл
-    temp_file = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
-    plt.savefig(temp_file.name, dpi=100, bbox_inches='tight')
-    plt.close()
+    return _png_bytes()
 
-    return temp_file.name
 
-
-async def generate_revenue_chart_from_server_data(daily_revenue: List[Dict],
-                                                  coin_purchases: List[Dict] = None) -> str:
+def _render_revenue_chart(daily_revenue: List[Dict], coin_purchases: List[Dict] = None,
+                          max_points: int = MAX_POINTS) -> bytes:
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
 
     dates = []
@@ -85,11 +135,7 @@ async def generate_revenue_chart_from_server_data(daily_revenue: List[Dict],
         date_str = revenue.get('Date', revenue.get('date', ''))
         if date_str:
             try:
-                if isinstance(date_str, str):
-                    date = datetime.strptime(date_str, '%Y-%m-%d')
-                else:
-                    date = date_str
-                dates.append(date)
+                dates.append(_parse_moment(date_str))
                 amounts.append(float(revenue.get('TotalRevenue', revenue.get('totalRevenue', 0))))
             except:
                 continue
@@ -100,8 +146,7 @@ async def generate_revenue_chart_from_server_data(daily_revenue: List[Dict],
                 date_str = purchase.get('Date', purchase.get('date', ''))
                 if date_str:
                     try:
-                        date = datetime.strptime(date_str, '%Y-%m-%d')
-                        dates.append(date)
+                        dates.append(_parse_moment(date_str))
                         amounts.append(float(purchase.get('Revenue', purchase.get('revenue', 0))))
                     except:
                         continue
@@ -111,48 +156,53 @@ async def generate_revenue_chart_from_server_data(daily_revenue: List[Dict],
 
     sorted_data = sorted(zip(dates, amounts), key=lambda x: x[0])
     dates, amounts = zip(*sorted_data)
+    amounts = np.asarray(amounts, dtype=float)
+    count = len(dates)
 
-    colors = ['#4ECDC4' if a > 0 else '#95E1D3' for a in amounts]
-    bars = ax1.bar(range(len(dates)), amounts, color=colors, alpha=0.7)
+    # Bars keep each bucket's min and max so revenue spikes stay visible
+    bar_keep = minmax_buckets(amounts, max_points // 2)
+    bar_amounts = amounts[bar_keep]
+    colors = np.where(bar_amounts > 0, '#4ECDC4', '#95E1D3')
+    bar_width = 0.8 * count / len(bar_keep)
+    bars = ax1.bar(bar_keep, bar_amounts, width=bar_width, color=colors, alpha=0.7)
 
     ax1.set_xlabel('Дата', fontsize=12)
     ax1.set_ylabel('Доход (€)', fontsize=12)
     ax1.set_title('Ежедневный доход', fontsize=14, fontweight='bold')
 
-    step = max(1, len(dates) // 10)
-    ax1.set_xticks(range(0, len(dates), step))
-    ax1.set_xticklabels([d.strftime('%d.%m') for i, d in enumerate(dates) if i % step == 0],
-                        rotation=45)
+    ticks = _label_positions(count)
+    tick_labels = [dates[i].strftime(_date_format(dates)) for i in ticks]
+    ax1.set_xticks(ticks)
+    ax1.set_xticklabels(tick_labels, rotation=45)
 
-    for i, (bar, amount) in enumerate(zip(bars, amounts)):
-        if amount > 0:
-            height = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width() / 2., height,
-                     f'{amount:.1f}€',
-                     ha='center', va='bottom', fontsize=8)
+    # Подписи над столбцами только пока они читаются
+    if len(bar_keep) <= 31:
+        for bar, amount in zip(bars, bar_amounts):
+            if amount > 0:
+                height = bar.get_height()
+                ax1.text(bar.get_x() + bar.get_width() / 2., height,
+                         f'{amount:.1f}€',
+                         ha='center', va='bottom', fontsize=8)
 
-    cumulative = []
-    total = 0
-    for amount in amounts:
-        total += amount
-        cumulative.append(total)
+    cumulative = np.cumsum(amounts)
+    line_keep = lttb(np.arange(count), cumulative, max_points)
+    few_points = len(line_keep) <= 60
 
-    ax2.plot(range(len(dates)), cumulative, marker='o', linewidth=2,
-             markersize=8, color='#6C5CE7')
-    ax2.fill_between(range(len(dates)), cumulative, alpha=0.3, color='#A29BFE')
+    ax2.plot(line_keep, cumulative[line_keep], marker='o' if few_points else None,
+             linewidth=2, markersize=8, color='#6C5CE7')
+    ax2.fill_between(line_keep, cumulative[line_keep], alpha=0.3, color='#A29BFE')
 
     ax2.set_xlabel('Дата', fontsize=12)
     ax2.set_ylabel('Накопленный доход (€)', fontsize=12)
     ax2.set_title('Накопленный доход', fontsize=14, fontweight='bold')
 
     # Настройка меток оси X для второго графика
-    ax2.set_xticks(range(0, len(dates), step))
-    ax2.set_xticklabels([d.strftime('%d.%m') for i, d in enumerate(dates) if i % step == 0],
-                        rotation=45)
+    ax2.set_xticks(ticks)
+    ax2.set_xticklabels(tick_labels, rotation=45)
 
-    if cumulative:
+    if len(cumulative):
         ax2.annotate(f'Итого: {cumulative[-1]:.2f}€',
-                     xy=(len(dates) - 1, cumulative[-1]),
+                     xy=(count - 1, cumulative[-1]),
                      xytext=(10, 10),
                      textcoords='offset points',
                      bbox=dict(boxstyle='round,pad=0.5', fc='yellow', alpha=0.5),
@@ -164,14 +214,10 @@ async def generate_revenue_chart_from_server_data(daily_revenue: List[Dict],
 
     plt.tight_layout()
 
-    temp_file = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
-    plt.savefig(temp_file.name, dpi=100, bbox_inches='tight')
-    plt.close()
-
-    return temp_file.name
+    return _png_bytes()
 
 
-async def generate_feature_usage_chart(features_data: List[Dict]) -> str:
+def _render_feature_usage_chart(features_data: List[Dict]) -> bytes:
 
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 7))
 
@@ -205,14 +251,10 @@ async def generate_feature_usage_chart(features_data: List[Dict]) -> str:
 
     plt.tight_layout()
 
-    temp_file = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
-    plt.savefig(temp_file.name, dpi=100, bbox_inches='tight')
-    plt.close()
-
-    return temp_file.name
+    return _png_bytes()
 
 
-async def generate_user_activity_chart(activity_data: Dict) -> str:
+def _render_user_activity_chart(activity_data: Dict) -> bytes:
 
     fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(12, 10))
 
@@ -268,28 +310,4 @@ async def generate_user_activity_chart(activity_data: Dict) -> str:
 
     plt.tight_layout()
 
-    temp_file = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
-    plt.savefig(temp_file.name, dpi=100, bbox_inches='tight')
-    plt.close()
-
-    return temp_file.name
-
-
-async def generate_spending_chart(data: List[tuple]) -> str:
-    daily_stats = []
-    for row in data:
-        daily_stats.append({
-            'Date': row[0] if isinstance(row[0], str) else row[0].strftime('%Y-%m-%d'),
-            'TotalSpent': row[1]
-        })
-    return await generate_spending_chart_from_server_data(daily_stats)
-
-
-async def generate_revenue_chart(data: List[tuple]) -> str:
-    daily_revenue = []
-    for row in data:
-        daily_revenue.append({
-            'Date': row[0] if isinstance(row[0], str) else row[0].strftime('%Y-%m-%d'),
-            'TotalRevenue': row[1]
-        })
-    return await generate_revenue_chart_from_server_data(daily_revenue, [])
\ No newline at end of file
+    return _png_bytes()
@@ -0,0 +1,46 @@
+"""Async chart entry points for handlers
+
+Render functions live in bot.utils.charts, which imports matplotlib and
+seaborn; only the chart workers load it. This module references them by
+name so the bot process never imports the plotting stack.
+"""
+from typing import List, Dict
+from bot.config import config
+from bot.utils.chart_service import chart_service
+
+
+async def generate_spending_chart_from_server_data(daily_stats: List[Dict]) -> bytes:
+    return await chart_service.render('_render_spending_chart', daily_stats, config.CHART_MAX_POINTS)
+
+
+async def generate_revenue_chart_from_server_data(daily_revenue: List[Dict],
+                                                  coin_purchases: List[Dict] = None) -> bytes:
+    return await chart_service.render('_render_revenue_chart', daily_revenue, coin_purchases, config.CHART_MAX_POINTS)
+
+
+async def generate_feature_usage_chart(features_data: List[Dict]) -> bytes:
+    return await chart_service.render('_render_feature_usage_chart', features_data)
+
+
+async def generate_user_activity_chart(activity_data: Dict) -> bytes:
+    return await chart_service.render('_render_user_activity_chart', activity_data)
+
+
+async def generate_spending_chart(data: List[tuple]) -> bytes:
+    daily_stats = []
+    for row in data:
+        daily_stats.append({
+            'Date': row[0] if isinstance(row[0], str) else row[0].strftime('%Y-%m-%d'),
+            'TotalSpent': row[1]
+        })
+    return await generate_spending_chart_from_server_data(daily_stats)
+
+
+async def generate_revenue_chart(data: List[tuple]) -> bytes:
+    daily_revenue = []
+    for row in data:
+        daily_revenue.append({
+            'Date': row[0] if isinstance(row[0], str) else row[0].strftime('%Y-%m-%d'),
+            'TotalRevenue': row[1]
+        })
+    return await generate_revenue_chart_from_server_data(daily_revenue, [])
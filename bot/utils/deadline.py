@@ -0,0 +1,24 @@
+import time
+from contextvars import ContextVar, Token
+from typing import Optional
+from bot.config import config
+
+_deadline: ContextVar[Optional[float]] = ContextVar('update_deadline', default=None)
+
+
+def set_deadline(seconds: float) -> Token:
+    """Start a time budget for the current update"""
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget, None if there is no budget"""
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return expires_at - time.monotonic()
+
+
+async def start_update_deadline(update, context):
+    """TypeHandler callback: give every incoming update one shared budget"""
+    set_deadline(config.UPDATE_DEADLINE)
@@ -0,0 +1,68 @@
+"""Point reduction for long time series charts
+
+lttb and minmax_buckets return sorted indices into the original series,
+so callers can pick dates, values and colors with the same index array;
+first and last points are always kept. bucket_envelope summarizes each
+bucket instead of picking points.
+"""
+import numpy as np
+
+
+def lttb(x, y, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: keep `threshold` points that preserve the line's shape"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # threshold - 2 buckets between the fixed first and last points
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start = end
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax_buckets(y, buckets: int) -> np.ndarray:
+    """Keep the minimum and maximum of each of `buckets` equal slices (peaks survive)"""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if buckets < 1 or n <= 2 * buckets:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    bucket_ids = np.repeat(np.arange(buckets), np.diff(edges))
+    # Sorted by bucket, then value: each bucket's slice starts with its min, ends with its max
+    order = np.lexsort((y, bucket_ids))
+    return np.unique(np.concatenate([order[edges[:-1]], order[edges[1:] - 1], [0, n - 1]]))
+
+
+def bucket_envelope(y, buckets: int):
+    """Split y into `buckets` equal slices -> (center indices, mins, maxs, means)
+
+    For dense, noisy series: draw the means as the line and the min/max
+    band as a filled area, which stays small however many points go in.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if buckets < 1 or n <= buckets:
+        return np.arange(n), y, y, y
+
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    starts = edges[:-1]
+    centers = (starts + edges[1:] - 1) // 2
+    return (centers, np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts),
+            np.add.reduceat(y, starts) / np.diff(edges))
@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from bot.utils import deadline
+
+logger = logging.getLogger(__name__)
+
+
+async def fan_out(sources: Dict[str, Callable[[], Awaitable[Any]]],
+                  timeout: Optional[float] = None) -> Tuple[Dict[str, Any], Dict[str, BaseException]]:
+    """Run independent fetches concurrently under one shared deadline
+
+    Returns (results, errors). A source that raises or does not finish in
+    time ends up in errors instead of failing the whole fan-out, so callers
+    can render partial data.
+    """
+    left = deadline.remaining()
+    if left is not None:
+        timeout = left if timeout is None else min(timeout, left)
+
+    tasks = {name: asyncio.ensure_future(factory()) for name, factory in sources.items()}
+    if not tasks:
+        return {}, {}
+
+    done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, BaseException] = {}
+
+    for name, task in tasks.items():
+        if task in pending:
+            errors[name] = asyncio.TimeoutError(f"{name} did not finish in {timeout:.1f}s")
+        elif task.exception() is not None:
+            errors[name] = task.exception()
+        else:
+            results[name] = task.result()
+
+    for name, error in errors.items():
+        logger.warning(f"Fan-out source '{name}' failed: {error!r}")
+
+    return results, errors
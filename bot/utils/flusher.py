@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicFlusher:
+    """Background task lifecycle shared by the write-behind buffers
+
+    Subclasses implement flush(). It runs every `interval` seconds, early
+    when wake() is called, and once more on stop(). Flush errors are
+    logged rather than raised, so one failing buffer never keeps the
+    others from stopping on shutdown.
+    """
+
+    def __init__(self, name: str, interval: float):
+        self.name = name
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+
+    def wake(self):
+        """Flush as soon as possible instead of waiting for the interval"""
+        self._wakeup.set()
+
+    def start(self):
+        """Start the background flusher (called from post_init)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write everything still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing {self.name} on shutdown: {e}")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            # A batch taken off the buffer must be written (or put back) even
+            # if stop() cancels this task; stop() then waits for it on the lock
+            await asyncio.shield(self._flush_logged())
+
+    async def _flush_logged(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing {self.name}: {e}")
+
+    async def flush(self):
+        raise NotImplementedError
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Tuple
+from sqlalchemy import bindparam, func
+from bot.config import config
+from bot.database import db_manager, LwCoinTransaction, User
+from bot.utils.flusher import PeriodicFlusher
+
+logger = logging.getLogger(__name__)
+
+
+class LedgerWriter(PeriodicFlusher):
+    """Group-commit writer for LwCoinTransaction rows
+
+    write() queues a row and returns only after the transaction holding it
+    has committed, so callers keep the same durability as a direct insert.
+    Rows queued by concurrent callers are inserted together, in batches of
+    at most LEDGER_BATCH_SIZE, waiting at most LEDGER_FLUSH_INTERVAL seconds
+    for a batch to fill. Pending rows are flushed on shutdown.
+    """
+
+    def __init__(self):
+        super().__init__('coin ledger', config.LEDGER_FLUSH_INTERVAL)
+        self._pending: List[Tuple[Dict, int, asyncio.Future]] = []
+        self._has_rows = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self.rows_written = 0
+        self.batches_written = 0
+
+    async def write(self, row: Dict, spent: int = 0):
+        """Insert a ledger row; also adds `spent` to the user's total_spent
+
+        Waits until the row is committed. Without a running writer the row
+        is written immediately on its own.
+        """
+        row.setdefault('created_at', datetime.utcnow())
+        row.setdefault('date', row['created_at'].strftime('%Y-%m-%d'))
+
+        if self._task is None:
+            await self._write_batch([(row, spent)])
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((row, spent, future))
+        self._has_rows.set()
+        if len(self._pending) >= config.LEDGER_BATCH_SIZE:
+            self._batch_full.set()
+
+        await future
+
+    async def _run(self):
+        # Group commit: idle until a row arrives, then wait for a full batch or the interval
+        while True:
+            await self._has_rows.wait()
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._has_rows.clear()
+            self._batch_full.clear()
+
+            # A batch taken off the queue must always settle its futures
+            await asyncio.shield(self.flush())
+
+    async def flush(self):
+        """Commit all queued rows, one transaction per batch"""
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._pending[:config.LEDGER_BATCH_SIZE]
+                del self._pending[:config.LEDGER_BATCH_SIZE]
+
+                try:
+                    await self._write_batch([(row, spent) for row, spent, _ in batch])
+                except Exception as e:
+                    logger.error(f"Error writing ledger batch of {len(batch)} rows: {e}")
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+
+    async def _write_batch(self, batch: List[Tuple[Dict, int]]):
+        spent_by_user: Dict[int, int] = defaultdict(int)
+        daily: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for row, spent in batch:
+            if spent:
+                spent_by_user[row['telegram_id']] += spent
+
+            day = daily[row['date']]
+            day['coin_transactions'] += 1
+            if row['type'] == 'spent':
+                day['coins_spent'] += abs(row['amount'])
+            else:
+                day['coins_credited'] += row['amount']
+
+        users = User.__table__
+        async with db_manager.engine.begin() as conn:
+            await conn.execute(LwCoinTransaction.__table__.insert(), [row for row, _ in batch])
+
+            if spent_by_user:
+                await conn.execute(
+                    users.update()
+                    .where(users.c.telegram_id == bindparam('b_telegram_id'))
+                    .values(total_spent=func.coalesce(users.c.total_spent, 0) + bindparam('b_spent')),
+                    [{'b_telegram_id': telegram_id, 'b_spent': spent}
+                     for telegram_id, spent in spent_by_user.items()]
+                )
+
+            for date, deltas in daily.items():
+                await db_manager.bump_daily_stats(conn, date, **deltas)
+
+        self.rows_written += len(batch)
+        self.batches_written += 1
+
+
+ledger_writer = LedgerWriter()
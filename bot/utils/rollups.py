@@ -0,0 +1,124 @@
+"""Daily rollups (DailyStats) for admin statistics
+
+Rows are maintained incrementally by the write paths through
+db_manager.bump_daily_stats: create_user (new_users), the Tribute webhook
+(payments, revenue, coins_credited) and the ledger writer (coin
+transactions). backfill() rebuilds the table from history:
+
+    python -m bot.utils.rollups --backfill
+"""
+import argparse
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict
+from sqlalchemy import case, delete, func, select
+from bot.database import db_manager, DailyStats, LwCoinTransaction, Payment, User
+
+logger = logging.getLogger(__name__)
+
+
+def today_key() -> str:
+    """DailyStats.date of the current UTC day"""
+    return datetime.utcnow().strftime('%Y-%m-%d')
+
+
+async def backfill() -> int:
+    """Recompute every DailyStats row from users, payments and the ledger"""
+    days: Dict[str, Dict[str, float]] = defaultdict(dict)
+
+    async with db_manager.engine.begin() as conn:
+        registered = func.date(User.created_at)
+        result = await conn.execute(
+            select(registered, func.count(User.id))
+            .where(User.created_at.isnot(None))
+            .group_by(registered)
+        )
+        for day, count in result:
+            days[str(day)]['new_users'] = count
+
+        completed = func.date(Payment.completed_at)
+        result = await conn.execute(
+            select(completed, func.count(Payment.id), func.coalesce(func.sum(Payment.amount), 0))
+            .where(Payment.status == 'completed')
+            .where(Payment.completed_at.isnot(None))
+            .group_by(completed)
+        )
+        for day, count, revenue in result:
+            days[str(day)].update(payments=count, revenue=revenue)
+
+        ledger_day = func.coalesce(LwCoinTransaction.date, func.date(LwCoinTransaction.created_at))
+        is_spent = LwCoinTransaction.type == 'spent'
+        result = await conn.execute(
+            select(
+                ledger_day,
+                func.count(LwCoinTransaction.id),
+                func.sum(case((is_spent, func.abs(LwCoinTransaction.amount)), else_=0)),
+                func.sum(case((is_spent, 0), else_=LwCoinTransaction.amount))
+            )
+            .group_by(ledger_day)
+        )
+        for day, count, spent, credited in result:
+            if day is not None:
+                days[str(day)].update(coin_transactions=count, coins_spent=spent or 0,
+                                      coins_credited=credited or 0)
+
+        await conn.execute(delete(DailyStats))
+        if days:
+            await conn.execute(DailyStats.__table__.insert(), [
+                {'date': day, 'new_users': 0, 'payments': 0, 'revenue': 0.0,
+                 'coin_transactions': 0, 'coins_spent': 0, 'coins_credited': 0, **values}
+                for day, values in days.items()
+            ])
+
+    logger.info(f"Backfilled daily stats for {len(days)} days")
+    return len(days)
+
+
+async def ensure_backfilled():
+    """Backfill once when rollups are empty but history exists (first start after upgrade)"""
+    async with db_manager.SessionLocal() as session:
+        has_rollups = (await session.execute(select(DailyStats.date).limit(1))).first()
+        has_users = (await session.execute(select(User.id).limit(1))).first()
+
+    if has_users and not has_rollups:
+        await backfill()
+
+
+async def get_totals() -> Dict[str, float]:
+    """All-time user and revenue totals, O(days) rows"""
+    async with db_manager.SessionLocal() as session:
+        result = await session.execute(
+            select(
+                func.coalesce(func.sum(DailyStats.new_users), 0),
+                func.coalesce(func.sum(DailyStats.revenue), 0)
+            )
+        )
+        total_users, total_revenue = result.one()
+
+    return {'total_users': total_users, 'total_revenue': total_revenue}
+
+
+async def get_day(day: str) -> Dict[str, float]:
+    """Counters of a single day (zeros when nothing happened)"""
+    async with db_manager.SessionLocal() as session:
+        result = await session.execute(select(DailyStats).where(DailyStats.date == day))
+        row = result.scalar_one_or_none()
+
+    columns = [column.name for column in DailyStats.__table__.columns if column.name != 'date']
+    return {name: (getattr(row, name) if row else 0) for name in columns}
+
+
+async def _main(args):
+    await db_manager.init_db()
+    if args.backfill:
+        days = await backfill()
+        print(f"Daily stats rebuilt: {days} days")
+    await db_manager.engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backfill', action='store_true', help="rebuild daily_stats from history")
+    asyncio.run(_main(parser.parse_args()))
@@ -1,57 +1,137 @@
 from bot.database import db_manager, ReferralLink, User
-from sqlalchemy import select, update
+from bot.config import config
+from bot.utils.cache import TTLCache
+from bot.utils.flusher import PeriodicFlusher
+from sqlalchemy import select, update, func, or_, exists, bindparam
+from typing import Dict, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class ReferralCounters(PeriodicFlusher):
+    """In-memory click/registration deltas per referral code
+
+    Deltas are merged per code and written every REFERRAL_FLUSH_INTERVAL
+    seconds (and on shutdown) as one UPDATE per code, together with the
+    link creator's referral_count. Readers add pending() to stored values.
+    """
+
+    def __init__(self):
+        super().__init__('referral counters', config.REFERRAL_FLUSH_INTERVAL)
+        self._pending: Dict[str, Tuple[int, int]] = {}
+        self.flushed_codes = 0
+
+    def add(self, code: str, clicks: int = 0, registrations: int = 0):
+        """Buffer counter deltas; never touches the database"""
+        pending_clicks, pending_registrations = self._pending.get(code, (0, 0))
+        self._pending[code] = (pending_clicks + clicks, pending_registrations + registrations)
+
+    def pending(self, code: str) -> Tuple[int, int]:
+        """Unflushed (clicks, registrations) for a code"""
+        return self._pending.get(code, (0, 0))
+
+    async def flush(self):
+        """Write pending deltas in a single transaction"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            batch, self._pending = self._pending, {}
+            links = ReferralLink.__table__
+            users = User.__table__
+            creator_id = (
+                select(links.c.creator_telegram_id)
+                .where(links.c.code == bindparam('b_code'))
+                .scalar_subquery()
+            )
+
+            try:
+                async with db_manager.engine.begin() as conn:
+                    await conn.execute(
+                        links.update()
+                        .where(links.c.code == bindparam('b_code'))
+                        .values(clicks=links.c.clicks + bindparam('b_clicks'),
+                                registrations=links.c.registrations + bindparam('b_registrations')),
+                        [{'b_code': code, 'b_clicks': clicks, 'b_registrations': registrations}
+                         for code, (clicks, registrations) in batch.items()]
+                    )
+
+                    registered = [{'b_code': code, 'b_registrations': registrations}
+                                  for code, (_, registrations) in batch.items() if registrations]
+                    if registered:
+                        await conn.execute(
+                            users.update()
+                            .where(users.c.telegram_id == creator_id)
+                            .values(referral_count=func.coalesce(users.c.referral_count, 0)
+                                    + bindparam('b_registrations')),
+                            registered
+                        )
+            except Exception:
+                # Merge the batch back with deltas buffered meanwhile
+                for code, (clicks, registrations) in batch.items():
+                    self.add(code, clicks, registrations)
+                raise
+
+            self.flushed_codes += len(batch)
+            logger.debug(f"Flushed referral counters for {len(batch)} codes")
+
+
+referral_counters = ReferralCounters()
+
+# Codes known to have a ReferralLink (links are never deleted)
+known_codes = TTLCache(config.REFERRAL_CODE_CACHE_SIZE, config.REFERRAL_CODE_CACHE_TTL)
+
+
 async def track_referral(code: str, telegram_id: int):
-    """Track referral link click and registration"""
+    """Track referral link click and registration
+
+    Only the user's attribution is written here (one conditional UPDATE,
+    so a registration is counted once); link counters go through
+    referral_counters. Clicks on codes without a link are not counted.
+    """
     async with db_manager.SessionLocal() as session:
-        # Find referral link
+        # Claim the user for an existing link unless already referred
         result = await session.execute(
-            select(ReferralLink).where(ReferralLink.code == code)
+            update(User)
+            .where(User.telegram_id == telegram_id)
+            .where(or_(User.referred_by.is_(None), User.referred_by == ''))
+            .where(exists().where(ReferralLink.code == code))
+            .values(referred_by=code)
+            .execution_options(synchronize_session=False)
         )
-        link = result.scalar_one_or_none()
-
-        if link:
-            # Update clicks
-            link.clicks += 1
-
-            # Check if user registered
-            result = await session.execute(
-                select(User).where(User.telegram_id == telegram_id)
-            )
-            user = result.scalar_one_or_none()
+        await session.commit()
 
-            if user and not user.referred_by:
-                user.referred_by = code
-                link.registrations += 1
+        registered = bool(result.rowcount)
+        if registered:
+            known_codes.set(code, True)
+        elif not known_codes.get(code):
+            link_id = await session.scalar(select(ReferralLink.id).where(ReferralLink.code == code))
+            if link_id is None:
+                logger.debug(f"Unknown referral code: {code} for user {telegram_id}")
+                return
+            known_codes.set(code, True)
 
-                # If link has creator, increase their referral count
-                if link.creator_telegram_id:
-                    creator_result = await session.execute(
-                        select(User).where(User.telegram_id == link.creator_telegram_id)
-                    )
-                    creator = creator_result.scalar_one_or_none()
-                    if creator:
-                        creator.referral_count += 1
+    referral_counters.add(code, clicks=1, registrations=int(registered))
 
-            await session.commit()
-            logger.info(f"Tracked referral: {code} for user {telegram_id}")
+    if registered:
+        db_manager.invalidate_user(telegram_id)
+    logger.info(f"Tracked referral: {code} for user {telegram_id}")
 
 
 async def track_purchase(code: str, amount: float):
     """Track purchase from referral link"""
     async with db_manager.SessionLocal() as session:
         result = await session.execute(
-            select(ReferralLink).where(ReferralLink.code == code)
+            update(ReferralLink)
+            .where(ReferralLink.code == code)
+            .values(
+                purchases=ReferralLink.purchases + 1,
+                total_revenue=ReferralLink.total_revenue + amount
+            )
         )
-        link = result.scalar_one_or_none()
 
-        if link:
-            link.purchases += 1
-            link.total_revenue += amount
+        if result.rowcount:
             await session.commit()
             logger.info(f"Tracked purchase: {code} amount {amount}")
 
@@ -65,10 +145,11 @@ async def get_referral_stats(code: str) -> dict:
         link = result.scalar_one_or_none()
 
         if link:
+            pending_clicks, pending_registrations = referral_counters.pending(code)
             return {
                 'name': link.name,
-                'clicks': link.clicks,
-                'registrations': link.registrations,
+                'clicks': link.clicks + pending_clicks,
+                'registrations': link.registrations + pending_registrations,
                 'purchases': link.purchases,
                 'revenue': link.total_revenue,
                 'created': link.created_at
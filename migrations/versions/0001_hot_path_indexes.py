@@ -0,0 +1,39 @@
+"""Secondary indexes for hot query paths
+
+Tables were historically created by DatabaseManager.init_db (create_all),
+so this first revision only adds indexes and is safe to run on both old
+and freshly created databases.
+
+Revision ID: 0001_hot_path_indexes
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = '0001_hot_path_indexes'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    # Tribute webhook: latest pending payment by telegram_id + package_id
+    ('ix_payments_tg_package_status_created', 'payments',
+     ['telegram_id', 'package_id', 'status', 'created_at']),
+    # Admin stats: total / today revenue of completed payments
+    ('ix_payments_status_completed_amount', 'payments',
+     ['status', 'completed_at', 'amount']),
+    # Admin stats: weekly active users
+    ('ix_bot_users_last_active', 'bot_users', ['last_active']),
+    # Admin referral list: active links, newest first
+    ('ix_referral_links_active_created', 'referral_links', ['is_active', 'created_at']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,35 @@
+"""Daily rollup table for admin statistics
+
+Creates daily_stats. The bot backfills it from history on its first start
+when the table is empty; to rebuild it manually run
+`python -m bot.utils.rollups --backfill`.
+
+Revision ID: 0002_daily_stats
+Revises: 0001_hot_path_indexes
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002_daily_stats'
+down_revision = '0001_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'daily_stats',
+        sa.Column('date', sa.String(10), primary_key=True),
+        sa.Column('new_users', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('payments', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Float, nullable=False, server_default='0'),
+        sa.Column('coin_transactions', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('coins_spent', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('coins_credited', sa.Integer, nullable=False, server_default='0'),
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('daily_stats', if_exists=True)